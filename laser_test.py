@@ -27,196 +27,744 @@ License:
     SOFTWARE.
 """
 
+import os
+import platform
 import ezdxf
+from ezdxf import bbox
+from ezdxf.addons import iterdxf
 import serial
 import time
 import math
+import collections
+import functools
+import queue
+import threading
+import numpy as np
+
+# Optional: Numba compiles the arc point kernel. It does not run on PyPy, whose JIT
+# already compiles the pure-Python loops, so it is only used on CPython.
+njit = None
+if platform.python_implementation() == "CPython":
+    try:
+        from numba import njit
+    except ImportError:
+        pass
 
 # ======== CONFIGURATION ========
 DXF_FILE = "test_complexe.dxf"  # Path to the DXF file
+GCODE_FILE = "test_complexe.gcode"  # Converted G-code, reused while newer than the DXF and this script
 SERIAL_PORT = "/dev/ttyACM0"    # Serial port for the laser engraver
 BAUDRATE = 115200                # Serial communication speed
+GRBL_RX_BUFFER_SIZE = 128        # Size of GRBL's serial receive buffer (bytes)
+RX_BYTES_MAX = GRBL_RX_BUFFER_SIZE - 1  # GRBL keeps one byte of its buffer free: most bytes in flight at once
+STARTUP_TIMEOUT = 5              # Maximum wait for GRBL's start-up message after a reset (s)
+COMMAND_TIMEOUT = 5              # Maximum wait for GRBL to acknowledge a setup command (s)
+HOMING_TIMEOUT = 60              # Maximum wait for the homing cycle to complete (s)
+STATUS_POLL_INTERVAL = 0.25      # Time between status queries while homing (s)
+WRITE_TIMEOUT = 5                # Maximum wait for a serial write to be accepted (s)
+MAX_MOVE_LENGTH = 1000           # Longest move of a single command, bounds the wait for its acknowledgement (mm)
+GCODE_QUEUE_SIZE = 2048          # G-code lines converted ahead of the serial sender
 LASER_POWER = 1000               # Laser power (0 to 1000)
 FEED_RATE = 600                  # Engraving speed in mm/min
 SCALE_FACTOR = 1.0               # Scale for the drawing
 OFFSET_X = 0                     # X offset for the drawing
 OFFSET_Y = 0                     # Y offset for the drawing
+WORK_WIDTH = None                # Machine travel in X: entities entirely outside are skipped (mm, None = no check)
+WORK_HEIGHT = None               # Machine travel in Y (mm, None = no check)
+CHORD_TOL = 0.05                 # Maximum deviation between an arc and its segments (mm)
+DECIMATE_EPSILON = 0.02          # Polyline simplification tolerance (mm, 0 = off)
+OPTIMIZE_TRAVEL = True           # Reorder entities to shorten laser-off travel between them
+
+# GRBL acknowledges a streamed command once the planner has room for it: at worst after one move completes
+ACK_TIMEOUT = COMMAND_TIMEOUT + 60 * MAX_MOVE_LENGTH / FEED_RATE
 
 # ======== UTILITY FUNCTIONS ========
-def apply_offset(x, y):
+IDENTITY_TRANSFORM = SCALE_FACTOR == 1.0 and OFFSET_X == 0 and OFFSET_Y == 0
+
+def apply_offset(x, y, scale=SCALE_FACTOR, offset_x=OFFSET_X, offset_y=OFFSET_Y):
     """Apply scaling and offset to coordinates."""
-    return x * SCALE_FACTOR + OFFSET_X, y * SCALE_FACTOR + OFFSET_Y
+    # The configuration is bound as default arguments: fast local lookups instead of globals
+    return x * scale + offset_x, y * scale + offset_y
+
+if IDENTITY_TRANSFORM:
+    # Default configuration: skip the per-point arithmetic entirely
+    def apply_offset(x, y):
+        """Return coordinates unchanged (scale 1, no offset)."""
+        return x, y
+
+def format_coord(value):
+    """Format a coordinate with 3 decimals, dropping trailing zeros to save bytes on the wire."""
+    text = ("%.3f" % value).rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+def apply_offset_arr(xs, ys):
+    """Apply scaling and offset in place to coordinate arrays."""
+    if not IDENTITY_TRANSFORM:
+        xs *= SCALE_FACTOR
+        xs += OFFSET_X
+        ys *= SCALE_FACTOR
+        ys += OFFSET_Y
+    return xs, ys
+
+# Laser commands of the configured job, built once
+LASER_ON = f"M3 S{LASER_POWER}"
+LASER_OFF = "M5"
 
 def laser_on(power=LASER_POWER):
     """Return G-code to turn the laser on with specified power."""
-    return f"M3 S{power}"
+    return LASER_ON if power == LASER_POWER else f"M3 S{power}"
 
 def laser_off():
     """Return G-code to turn the laser off."""
-    return "M5"
+    return LASER_OFF
+
+# Move templates built once, filled with the %-operator (CPython's fastest formatting path)
+RAPID_FORMAT = "G0 X%s Y%s".__mod__
+ENGRAVE_FORMAT = "G1 X%s Y%s".__mod__
+ENGRAVE_FEED_FORMAT = ("G1 X%s Y%s F" + str(FEED_RATE)).__mod__
 
 def rapid_move(x, y):
     """Return G-code for rapid move (laser off)."""
-    return f"G0 X{x:.3f} Y{y:.3f}"
+    return RAPID_FORMAT((format_coord(x), format_coord(y)))
 
 def engrave_move(x, y):
     """Return G-code for engraving move (laser on)."""
-    return f"G1 X{x:.3f} Y{y:.3f} F{FEED_RATE}"
-
-def process_lwpolyline(entity):
-    """Convert a lightweight polyline entity to G-code commands."""
-    commands = []
-    points = entity.get_points('xy')
-    if not points:
-        return commands
-    # Move to start point with laser off
-    x_start, y_start = apply_offset(*points[0])
-    commands.append(laser_off())
-    commands.append(rapid_move(x_start, y_start))
-    commands.append(laser_on())
-    # Engrave each segment
-    for x, y in points[1:]:
-        x, y = apply_offset(x, y)
-        commands.append(engrave_move(x, y))
-    # Close polyline if needed
-    if entity.closed:
-        x, y = apply_offset(points[0][0], points[0][1])
-        commands.append(engrave_move(x, y))
-    commands.append(laser_off())
-    return commands
-
-def process_spline(entity):
-    """Convert a spline entity to G-code commands by flattening to line segments."""
-    spline_points = list(entity.flattening(distance_tolerance=0.1, angle_tolerance=5, num_points=60))
-    if not spline_points:
-        return []
-    commands = []
-    x_start, y_start, _ = spline_points[0]
+    return ENGRAVE_FEED_FORMAT((format_coord(x), format_coord(y)))
+
+def engrave_lines(points, feed=FEED_RATE):
+    """Return G-code engraving moves through points, stating the feed rate only once (G1 is modal)."""
+    lines = [ENGRAVE_FORMAT((format_coord(x), format_coord(y))) for x, y in points]
+    if lines:
+        lines[0] += f" F{feed}"
+    return lines
+
+def arc_segments(radius, sweep):
+    """Return the minimum number of segments keeping an arc within CHORD_TOL of its chords."""
+    if radius <= CHORD_TOL:
+        return 2
+    segment_angle = 2 * math.acos(1 - CHORD_TOL / radius)
+    return max(2, math.ceil(abs(sweep) / segment_angle))
+
+def arc_points(cx, cy, radius, start_angle, end_angle, num_points):
+    """Return the x and y arrays of num_points + 1 points along an arc."""
+    # Compute in place, reusing the angle array for the y coordinates
+    ys = np.linspace(start_angle, end_angle, num_points + 1)
+    xs = np.cos(ys)
+    xs *= radius
+    xs += cx
+    np.sin(ys, out=ys)
+    ys *= radius
+    ys += cy
+    return xs, ys
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _fill_arc_points(cx, cy, radius, start_angle, end_angle, num_points, out_x, out_y):
+        # Rotate the radius vector by a fixed step (angle-addition recurrence):
+        # four trigonometric calls per arc instead of two per point
+        step = (end_angle - start_angle) / num_points
+        cos_step = math.cos(step)
+        sin_step = math.sin(step)
+        c = math.cos(start_angle)
+        s = math.sin(start_angle)
+        for i in range(num_points + 1):
+            out_x[i] = cx + radius * c
+            out_y[i] = cy + radius * s
+            c, s = c * cos_step - s * sin_step, s * cos_step + c * sin_step
+
+    def arc_points(cx, cy, radius, start_angle, end_angle, num_points):
+        """Return the x and y arrays of num_points + 1 points along an arc (Numba kernel)."""
+        xs = np.empty(num_points + 1)
+        ys = np.empty(num_points + 1)
+        _fill_arc_points(cx, cy, radius, start_angle, end_angle, num_points, xs, ys)
+        return xs, ys
+
+def process_line(entity, reverse=False):
+    """Yield the G-code commands of a line entity, from its end point back to its start if reverse."""
+    print("Drawing line...")
+    start, end = (entity.dxf.end, entity.dxf.start) if reverse else (entity.dxf.start, entity.dxf.end)
+    x1, y1 = apply_offset(start.x, start.y)
+    x2, y2 = apply_offset(end.x, end.y)
+    yield LASER_OFF
+    yield rapid_move(x1, y1)
+    yield LASER_ON
+    yield engrave_move(x2, y2)
+    yield LASER_OFF
+
+def engrave_path(xs, ys):
+    """Yield the G-code commands engraving the path through the xs, ys coordinate arrays."""
+    xs, ys = xs.tolist(), ys.tolist()
+    yield LASER_OFF
+    yield rapid_move(xs[0], ys[0])
+    yield LASER_ON
+    yield from engrave_lines(zip(xs[1:], ys[1:]))
+    yield LASER_OFF
+
+def process_arc(entity, reverse=False):
+    """Yield the G-code commands of an arc entity, from its end point back to its start if reverse."""
+    print("Drawing arc...")
+    cx, cy = apply_offset(entity.dxf.center.x, entity.dxf.center.y)
+    radius = entity.dxf.radius * SCALE_FACTOR
+    start_angle = math.radians(entity.dxf.start_angle)
+    end_angle = math.radians(entity.dxf.end_angle)
+    num_points = arc_segments(radius, end_angle - start_angle)
+    xs, ys = arc_points(cx, cy, radius, start_angle, end_angle, num_points)
+    if reverse:
+        xs, ys = xs[::-1], ys[::-1]
+    yield from engrave_path(xs, ys)
+
+def process_circle(entity, reverse=False):
+    """Yield the G-code commands of a circle entity (closed: reverse is ignored)."""
+    print("Drawing circle...")
+    cx, cy = apply_offset(entity.dxf.center.x, entity.dxf.center.y)
+    radius = entity.dxf.radius * SCALE_FACTOR
+    yield from engrave_path(*circle_points(cx, cy, radius, arc_segments(radius, 2 * math.pi)))
+
+def process_point(entity, reverse=False):
+    """Yield the G-code commands moving to a point entity with the laser off (reverse is ignored)."""
+    print("Moving to point...")
+    x, y = apply_offset(entity.dxf.location.x, entity.dxf.location.y)
+    yield LASER_OFF
+    yield rapid_move(x, y)
+
+@functools.lru_cache(maxsize=64)
+def unit_circle(num_points):
+    """Return the cos and sin arrays of a unit circle of num_points segments, closed exactly on its start point."""
+    step = 2 * math.pi / num_points
+    cos_table, sin_table = arc_points(0.0, 0.0, 1.0, 0.0, 2 * math.pi - step, num_points - 1)
+    cos_table = np.append(cos_table, cos_table[0])
+    sin_table = np.append(sin_table, sin_table[0])
+    cos_table.flags.writeable = sin_table.flags.writeable = False  # Shared between calls
+    return cos_table, sin_table
+
+def circle_points(cx, cy, radius, num_points):
+    """Return the x and y arrays of a circle of num_points segments, closed exactly on its start point."""
+    # Circles of the same segment count reuse one table: no trigonometry per entity
+    cos_table, sin_table = unit_circle(num_points)
+    xs = cos_table * radius
+    xs += cx
+    ys = sin_table * radius
+    ys += cy
+    return xs, ys
+
+def _mark_kept(points, epsilon, keep):
+    """Flag in keep the points a Ramer-Douglas-Peucker simplification within epsilon retains."""
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        inner = points[first + 1:last] - points[first]
+        length = math.hypot(segment[0], segment[1])
+        if length == 0:  # Closed path: measure the distance to the common end point
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > epsilon:
+            farthest += first + 1
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+if njit is not None:
+    @njit(cache=True)
+    def _mark_kept(points, epsilon, keep):
+        # Same algorithm as above with a scalar inner loop: no temporary arrays per segment
+        stack = np.empty((2 * len(points), 2), dtype=np.int64)
+        stack[0, 0] = 0
+        stack[0, 1] = len(points) - 1
+        top = 1
+        while top:
+            top -= 1
+            first = stack[top, 0]
+            last = stack[top, 1]
+            if last - first < 2:
+                continue
+            x0 = points[first, 0]
+            y0 = points[first, 1]
+            dx = points[last, 0] - x0
+            dy = points[last, 1] - y0
+            length = math.hypot(dx, dy)
+            farthest = -1
+            max_distance = epsilon
+            for i in range(first + 1, last):
+                px = points[i, 0] - x0
+                py = points[i, 1] - y0
+                if length == 0:  # Closed path: measure the distance to the common end point
+                    distance = math.hypot(px, py)
+                else:
+                    distance = abs(dx * py - dy * px) / length
+                if distance > max_distance:
+                    max_distance = distance
+                    farthest = i
+            if farthest >= 0:
+                keep[farthest] = True
+                stack[top, 0] = first
+                stack[top, 1] = farthest
+                stack[top + 1, 0] = farthest
+                stack[top + 1, 1] = last
+                top += 2
+
+def decimate(points, epsilon):
+    """Return the (N, 2) points kept by a Ramer-Douglas-Peucker simplification within epsilon."""
+    if epsilon <= 0 or len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    _mark_kept(points, epsilon, keep)
+    return points[keep]
+
+def lwpolyline_vertices(entity):
+    """Return an (N, 2) array of a lightweight polyline's x, y vertices."""
+    return np.asarray(entity.get_points("xy"), dtype=np.float64).reshape(-1, 2)
+
+def process_lwpolyline(entity, reverse=False):
+    """Yield the G-code commands of a lightweight polyline entity, from its last vertex back if reverse."""
+    print("Drawing polyline...")
+    vertices = lwpolyline_vertices(entity)
+    if not len(vertices):
+        return
+    # Copy into a single array, going back to the start point if the polyline is closed
+    points = np.empty((len(vertices) + bool(entity.closed), 2))
+    points[:len(vertices)] = vertices
+    points[len(vertices):] = vertices[0]
+    apply_offset_arr(points[:, 0], points[:, 1])
+    points = decimate(points, DECIMATE_EPSILON)
+    if reverse and not entity.closed:
+        points = points[::-1]
+    yield from engrave_path(points[:, 0], points[:, 1])
+
+def process_spline(entity, reverse=False):
+    """Yield the G-code commands of a spline entity flattened to line segments, from its end back if reverse."""
+    print("Drawing spline...")
+    # Adaptive flattening: segments are subdivided only where the curve leaves CHORD_TOL on the
+    # workpiece (the spline is flattened in DXF units, before scaling), consumed in a single pass
+    # instead of building a list (unless it must be walked backwards)
+    spline_points = entity.flattening(CHORD_TOL / abs(SCALE_FACTOR))
+    spline_points = iter(list(spline_points)[::-1] if reverse else spline_points)
+    first_point = next(spline_points, None)
+    if first_point is None:
+        return
+    x_start, y_start, _ = first_point
     x_start, y_start = apply_offset(x_start, y_start)
-    commands.append(laser_off())
-    commands.append(rapid_move(x_start, y_start))
-    commands.append(laser_on())
-    for x, y, _ in spline_points[1:]:
-        x, y = apply_offset(x, y)
-        commands.append(engrave_move(x, y))
-    commands.append(laser_off())
-    return commands
+    yield LASER_OFF
+    yield rapid_move(x_start, y_start)
+    yield LASER_ON
+    if IDENTITY_TRANSFORM:
+        yield from engrave_lines((x, y) for x, y, _ in spline_points)
+    else:
+        yield from engrave_lines(apply_offset(x, y) for x, y, _ in spline_points)
+    yield LASER_OFF
+
+# G-code generator for each supported DXF entity type
+ENTITY_HANDLERS = {
+    "LINE": process_line,
+    "ARC": process_arc,
+    "CIRCLE": process_circle,
+    "POINT": process_point,
+    "LWPOLYLINE": process_lwpolyline,
+    "SPLINE": process_spline,
+}
+
+INIT_COMMANDS = (
+    b"$X",         # Unlock
+    b"G21",        # Set units to mm
+    b"G90",        # Absolute positioning
+    b"M5",         # Laser OFF
+    b"G92 X0 Y0",  # Set current position as (0,0)
+)
+
+class MachineAlarm(Exception):
+    """GRBL entered an alarm state: it rejects every further command until it is reset."""
+
+def read_ack(ser, timeout=None):
+    """Wait until GRBL acknowledges one command with 'ok' or 'error', and return its response.
+
+    Returns an empty string if no acknowledgement arrives within timeout seconds (None waits forever).
+    Raises MachineAlarm if GRBL reports an alarm instead.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        response = ser.readline().strip().decode(errors="replace")
+        if not response:
+            if deadline is not None and time.monotonic() > deadline:
+                print("No response from the machine.")
+                return ""
+            continue
+        print(f"Response: {response}")
+        if response.startswith("ALARM"):
+            raise MachineAlarm(response)
+        if response == "ok" or response.startswith("error"):
+            return response
+
+def read_stream_ack(ser):
+    """Wait for the acknowledgement of a streamed command, raising TimeoutError if none arrives in ACK_TIMEOUT."""
+    response = read_ack(ser, timeout=ACK_TIMEOUT)
+    if not response:
+        raise TimeoutError(f"no acknowledgement within {ACK_TIMEOUT:.0f} s")
+    return response
+
+def wait_for_startup(ser, timeout=STARTUP_TIMEOUT):
+    """Soft-reset GRBL and wait for its start-up message, instead of sleeping a fixed time.
+
+    Opening the port only resets boards that wire DTR to reset. The Ctrl-X resets any controller
+    and also clears an alarm or a job left over from a previous run, so each job starts from a known state.
+    """
+    ser.write(b"\x18")  # Ctrl-X: GRBL answers with its 'Grbl x.y ...' banner once ready
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = ser.readline().strip().decode(errors="replace")
+        if response.startswith("Grbl"):
+            print(f"Response: {response}")
+            return True
+    print("No start-up message from the machine.")
+    return False
+
+def wait_for_homing(ser, timeout=HOMING_TIMEOUT):
+    """Wait for the homing cycle to be acknowledged, polling GRBL's status meanwhile, and return the response.
+
+    Returns an empty string if the cycle outlasts timeout, or as soon as GRBL leaves status queries
+    unanswered for COMMAND_TIMEOUT seconds. Raises MachineAlarm if the homing cycle fails.
+    """
+    answered_at = time.monotonic()
+    deadline = answered_at + timeout
+    poll_at = answered_at
+    state = None
+    while True:
+        now = time.monotonic()
+        if now > deadline or now - answered_at > COMMAND_TIMEOUT:
+            print("No response from the machine.")
+            return ""
+        if now >= poll_at:
+            ser.write(b"?")  # Real-time status query: answered even while the homing cycle runs
+            poll_at = now + STATUS_POLL_INTERVAL
+        response = ser.readline().strip().decode(errors="replace")
+        if not response:
+            continue
+        answered_at = time.monotonic()
+        if response.startswith("<"):  # Status report '<State|...>': only state changes are printed
+            new_state = response[1:].split("|", 1)[0]
+            if new_state != state:
+                print(f"Status: {new_state}")
+                state = new_state
+            continue
+        print(f"Response: {response}")
+        if response.startswith("ALARM"):
+            raise MachineAlarm(response)
+        if response == "ok" or response.startswith("error"):
+            return response
 
 def initialize_machine(ser, do_homing=True):
-    """Send initialization and homing commands to the laser engraver."""
+    """Send initialization and homing commands to the laser engraver, waiting for each acknowledgement."""
     print("Initializing machine...")
     if do_homing:
         print("Performing homing...")
         ser.write(b"$H\n")
-        time.sleep(5)
-    ser.write(b"$X\n")  # Unlock
-    time.sleep(0.5)
-    ser.write(b"G21\n")  # Set units to mm
-    time.sleep(0.1)
-    ser.write(b"G90\n")  # Absolute positioning
-    time.sleep(0.1)
-    ser.write(b"M5\n")   # Laser OFF
-    time.sleep(0.1)
-    ser.write(b"G92 X0 Y0\n")  # Set current position as (0,0)
-    time.sleep(0.1)
+        wait_for_homing(ser)  # GRBL answers once the homing cycle is done
+    # The setup commands fit in GRBL's RX buffer: send them at once, then collect the acknowledgements
+    ser.write(b"".join(command + b"\n" for command in INIT_COMMANDS))
+    for _ in INIT_COMMANDS:
+        read_ack(ser, timeout=COMMAND_TIMEOUT)
     print("Machine initialized and ready.")
 
 # ======== DXF TO G-CODE CONVERSION ========
 def dxf_to_gcode(filename):
-    """Convert DXF entities to a list of G-code commands."""
+    """Read a DXF file and return a generator of its G-code commands (empty list on error)."""
     try:
-        doc = ezdxf.readfile(filename)
+        if OPTIMIZE_TRAVEL:
+            doc = ezdxf.readfile(filename)
+        else:
+            # Nothing to reorder: stream the entities as the file is parsed, without loading the document
+            doc = iterdxf.opendxf(filename)
     except IOError:
         print(f"Error opening file {filename}.")
         return []
     except ezdxf.DXFStructureError:
         print(f"File {filename} is not a valid DXF file.")
         return []
+    if not OPTIMIZE_TRAVEL:
+        return drop_redundant_modal(generate_gcode((entity, False) for entity in stream_entities(doc)))
     msp = doc.modelspace()
-    gcode = ["G21", "G90", laser_off()]
-    for entity in msp:
-        if entity.dxftype() == "LINE":
-            print("Drawing line...")
-            x1, y1 = apply_offset(entity.dxf.start.x, entity.dxf.start.y)
-            x2, y2 = apply_offset(entity.dxf.end.x, entity.dxf.end.y)
-            gcode.append(laser_off())
-            gcode.append(rapid_move(x1, y1))
-            gcode.append(laser_on())
-            gcode.append(engrave_move(x2, y2))
-            gcode.append(laser_off())
-        elif entity.dxftype() == "ARC":
-            print("Drawing arc...")
-            cx, cy = apply_offset(entity.dxf.center.x, entity.dxf.center.y)
-            radius = entity.dxf.radius * SCALE_FACTOR
-            start_angle = math.radians(entity.dxf.start_angle)
-            end_angle = math.radians(entity.dxf.end_angle)
-            num_points = 50
-            points = []
-            for i in range(num_points + 1):
-                angle = start_angle + (end_angle - start_angle) * (i / num_points)
-                x = cx + radius * math.cos(angle)
-                y = cy + radius * math.sin(angle)
-                points.append((x, y))
-            if points:
-                gcode.append(laser_off())
-                gcode.append(rapid_move(points[0][0], points[0][1]))
-                gcode.append(laser_on())
-                for x, y in points[1:]:
-                    gcode.append(engrave_move(x, y))
-                gcode.append(laser_off())
-        elif entity.dxftype() == "CIRCLE":
-            print("Drawing circle...")
-            cx, cy = apply_offset(entity.dxf.center.x, entity.dxf.center.y)
-            radius = entity.dxf.radius * SCALE_FACTOR
-            num_points = 50
-            points = [(cx + radius * math.cos(2 * math.pi * i / num_points),
-                       cy + radius * math.sin(2 * math.pi * i / num_points)) for i in range(num_points + 1)]
-            if points:
-                gcode.append(laser_off())
-                gcode.append(rapid_move(points[0][0], points[0][1]))
-                gcode.append(laser_on())
-                for x, y in points[1:]:
-                    gcode.append(engrave_move(x, y))
-                gcode.append(laser_off())
-        elif entity.dxftype() == "POINT":
-            print("Moving to point...")
-            x, y = apply_offset(entity.dxf.location.x, entity.dxf.location.y)
-            gcode.append(laser_off())
-            gcode.append(rapid_move(x, y))
-        elif entity.dxftype() == "LWPOLYLINE":
-            print("Drawing polyline...")
-            gcode += process_lwpolyline(entity)
-        elif entity.dxftype() == "SPLINE":
-            print("Drawing spline...")
-            gcode += process_spline(entity)
-        else:
-            print(f"Unknown entity: {entity.dxftype()}")
-    gcode.append(laser_off())
-    gcode.append("G0 X0 Y0")  # Return to origin
-    return gcode
+    entities = msp.query(" ".join(ENTITY_HANDLERS))
+    skipped = len(msp) - len(entities)
+    if skipped:
+        print(f"Skipping {skipped} unsupported entities.")
+    return drop_redundant_modal(generate_gcode(order_by_travel(entities)))
+
+def stream_entities(doc):
+    """Yield the supported modelspace entities of a file opened with iterdxf, then close it.
+
+    The number of unsupported entities is reported once the file has been read.
+    """
+    skipped = 0
+    try:
+        for entity in doc.modelspace():
+            if entity.dxftype() in ENTITY_HANDLERS:
+                yield entity
+            else:
+                skipped += 1
+    finally:
+        doc.close()
+    if skipped:
+        print(f"Skipped {skipped} unsupported entities.")
+
+def entity_endpoints(entity):
+    """Return the DXF (x, y) start and end points of the path engraved for an entity."""
+    kind = entity.dxftype()
+    if kind == "LINE":
+        start, end = entity.dxf.start, entity.dxf.end
+    elif kind == "ARC":
+        start, end = entity.start_point, entity.end_point
+    elif kind == "CIRCLE":
+        start = end = entity.dxf.center + (entity.dxf.radius, 0)
+    elif kind == "POINT":
+        start = end = entity.dxf.location
+    elif kind == "LWPOLYLINE":
+        points = lwpolyline_vertices(entity) if len(entity) else [(0, 0)]
+        start, end = points[0], points[0] if entity.closed else points[-1]
+    else:  # SPLINE, approximated by its first and last defining points
+        points = entity.control_points if len(entity.control_points) else entity.fit_points
+        start, end = (points[0], points[-1]) if len(points) else ((0, 0), (0, 0))
+    return (start[0], start[1]), (end[0], end[1])
+
+def order_by_travel(entities):
+    """Order entities greedily, each starting as close as possible to where the previous one ended.
+
+    Returns (entity, reverse) pairs: an open path may be engraved from its end back to its start.
+    The file order is kept when the greedy tour does not shorten the laser-off travel.
+    """
+    entities = list(entities)
+    in_file_order = [(entity, False) for entity in entities]
+    if len(entities) < 2:
+        return in_file_order
+    endpoints = [entity_endpoints(entity) for entity in entities]
+    starts = np.array([start for start, _ in endpoints], dtype=np.float64)
+    ends = np.array([end for _, end in endpoints], dtype=np.float64)
+    # The job starts at the machine origin, expressed in DXF coordinates
+    origin = np.array([-OFFSET_X, -OFFSET_Y], dtype=np.float64) / SCALE_FACTOR
+    # Entity i is entered at entries[i] going forwards, or at entries[count + i] reversed
+    count = len(entities)
+    entries = np.concatenate((starts, ends))
+    exits = np.concatenate((ends, starts))
+    remaining = np.ones(count, dtype=bool)
+    position = origin
+    ordered = []
+    travel = 0.0
+    for _ in range(count):
+        distances = ((entries - position) ** 2).sum(axis=1)
+        distances[:count][~remaining] = np.inf
+        distances[count:][~remaining] = np.inf
+        nearest = int(distances.argmin())  # Forward wins ties: closed paths are never reversed
+        remaining[nearest % count] = False
+        ordered.append((entities[nearest % count], nearest >= count))
+        travel += math.sqrt(distances[nearest])
+        position = exits[nearest]
+    file_travel = np.hypot(*(starts - np.vstack((origin, ends[:-1]))).T).sum()
+    return ordered if travel < file_travel else in_file_order
+
+def drop_redundant_modal(lines):
+    """Skip laser commands and move words (G0/G1, X, Y, F) that repeat the machine's current modal state.
+
+    A laser-off is held back until the next command that is actually sent: when the following
+    path starts where the previous one ended, its laser-on cancels it and the engraving goes on.
+    """
+    laser_state = None
+    held_off = None  # Laser-off not sent yet
+    modal = {}  # Last word sent for each modal letter
+    for line in lines:
+        if line.startswith("M5"):
+            if laser_state is not None and laser_state.startswith("M3"):
+                held_off = line
+                continue
+            if line == laser_state:
+                continue
+        elif line.startswith("M3"):
+            if line == laser_state:
+                held_off = None  # Continuous path: keep the laser on
+                continue
+            held_off = None  # Switching power directly, no off needed between the two
+        elif line.startswith(("G0 ", "G1 ")):
+            words = [word for word in line.split(" ") if modal.get(word[0]) != word]
+            if not any(word[0] in "XY" for word in words):
+                # Zero-length move: only a new feed rate is worth sending (a G word without axes is an error)
+                words = [word for word in words if word[0] == "F"]
+                if not words:
+                    continue
+            for word in words:
+                modal[word[0]] = word
+            line = " ".join(words)
+        if held_off is not None:
+            yield held_off
+            laser_state = held_off
+            held_off = None
+        if line.startswith(("M3", "M5")):
+            laser_state = line
+        yield line
+    if held_off is not None:
+        yield held_off
+
+def in_work_area(entity):
+    """Return True if the entity's bounding box, in machine coordinates, overlaps the work area."""
+    # fast=True bounds curves by their control points instead of flattening them
+    box = bbox.extents((entity,), fast=True)
+    if not box.has_data:
+        return True
+    x0, y0 = apply_offset(box.extmin.x, box.extmin.y)
+    x1, y1 = apply_offset(box.extmax.x, box.extmax.y)
+    return max(x0, x1) >= 0 and min(x0, x1) <= WORK_WIDTH and max(y0, y1) >= 0 and min(y0, y1) <= WORK_HEIGHT
+
+def generate_gcode(entities):
+    """Yield G-code commands for (entity, reverse) pairs, so sending can start before conversion ends."""
+    yield "G21"
+    yield "G90"
+    yield LASER_OFF
+    check_work_area = WORK_WIDTH is not None and WORK_HEIGHT is not None
+    for entity, reverse in entities:
+        if check_work_area and not in_work_area(entity):
+            print(f"Skipping {entity.dxftype()} outside the work area.")
+            continue
+        yield from ENTITY_HANDLERS[entity.dxftype()](entity, reverse)
+    yield LASER_OFF
+    yield "G0 X0 Y0"  # Return to origin
+
+class ConversionError(Exception):
+    """The G-code conversion failed while its first lines were already being streamed."""
+
+def prefetch(lines, maxsize=GCODE_QUEUE_SIZE):
+    """Iterate over lines produced by a background thread, so DXF conversion overlaps serial streaming.
+
+    Yields None before waiting on a producer that has fallen behind, so the consumer can send
+    what it holds. Raises ConversionError as soon as the producer fails, without streaming the
+    lines still queued.
+    """
+    buffer = queue.Queue(maxsize)
+    done = object()
+    errors = []
+
+    def producer():
+        try:
+            for line in lines:
+                buffer.put(line)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            buffer.put(done)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        try:
+            line = buffer.get_nowait()
+        except queue.Empty:
+            yield None
+            line = buffer.get()
+        if line is done or errors:
+            break
+        yield line
+    if errors:
+        raise ConversionError(errors[0]) from errors[0]
+
+# ======== G-CODE FILE CACHE ========
+def is_gcode_file_fresh(gcode_path, dxf_path):
+    """Return True if the G-code file is newer than both the DXF file and this script's configuration."""
+    try:
+        gcode_mtime = os.path.getmtime(gcode_path)
+        return gcode_mtime >= max(os.path.getmtime(dxf_path), os.path.getmtime(__file__))
+    except OSError:
+        return False
+
+def write_gcode_file(lines, path):
+    """Yield lines while writing them to a G-code file, which is only put in place once complete."""
+    part_path = path + ".part"
+    with open(part_path, "wb", buffering=1 << 20) as f:
+        for line in lines:
+            f.write(line.encode("utf-8") + b"\n")
+            yield line
+    os.replace(part_path, path)
+
+def read_gcode_file(path):
+    """Yield the lines of a G-code file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
 
 # ======== SEND G-CODE TO MACHINE ========
+def enable_low_latency(ser):
+    """Ask the serial driver to deliver received bytes immediately instead of waiting for its latency timer."""
+    try:
+        ser.set_low_latency_mode(True)  # ioctl setting ASYNC_LOW_LATENCY, Linux only
+    except (AttributeError, ValueError, OSError) as e:
+        print(f"Low-latency mode not available: {e}")
+
 def send_gcode_to_machine(gcode_lines, port, baudrate):
-    """Send G-code commands to the laser engraver via serial port."""
+    """Send G-code commands (any iterable of lines) to the laser engraver via serial port.
+
+    A None line writes out the commands gathered so far (see prefetch).
+    """
     try:
-        with serial.Serial(port, baudrate, timeout=1) as ser:
-            time.sleep(2)
-            ser.write(b"\r\n\r\n")  # Wake up controller
-            time.sleep(2)
+        with serial.Serial(port, baudrate, timeout=1, write_timeout=WRITE_TIMEOUT) as ser:
+            enable_low_latency(ser)
+            wait_for_startup(ser)
             ser.flushInput()
-            initialize_machine(ser, do_homing=True)
-            for line in gcode_lines:
-                command = line.strip() + '\n'
-                print(f"Sent: {command.strip()}")
-                ser.write(command.encode('utf-8'))
-                response = ser.readline()
-                if response:
-                    print(f"Response: {response.strip().decode()}")
+            try:
+                initialize_machine(ser, do_homing=True)
+                # Character-counting protocol: keep GRBL's RX buffer full instead of
+                # waiting for an acknowledgement after every single line.
+                # Commands are gathered and written in one call right before waiting for
+                # an acknowledgement or for the next line, instead of one write syscall per line.
+                pending = collections.deque()  # Sizes of the commands not yet acknowledged
+                in_flight = 0
+                out = bytearray()
+                out_lines = []
+
+                def flush():
+                    ser.write(out)
+                    for sent in out_lines:
+                        print(f"Sent: {sent}")
+                    out.clear()
+                    out_lines.clear()
+
+                for line in gcode_lines:
+                    if line is None:
+                        if out:
+                            flush()
+                        continue
+                    line = line.strip()
+                    command = line.encode('utf-8') + b'\n'
+                    if pending and in_flight + len(command) > RX_BYTES_MAX:
+                        if out:
+                            flush()
+                        # Wait for room, then also collect the acknowledgements that already
+                        # arrived, so the next write carries as many commands as possible
+                        while pending and (in_flight + len(command) > RX_BYTES_MAX or ser.in_waiting):
+                            read_stream_ack(ser)
+                            in_flight -= pending.popleft()
+                    out += command
+                    pending.append(len(command))
+                    in_flight += len(command)
+                    out_lines.append(line)
+                if out:
+                    flush()
+                while pending:
+                    read_stream_ack(ser)
+                    pending.popleft()
+            except (MachineAlarm, TimeoutError, ConversionError, serial.SerialTimeoutException) as e:
+                # Stop streaming and reset GRBL: the laser is switched off and the buffered commands are dropped
+                print(f"Aborting the job: {e}")
+                ser.reset_output_buffer()  # A stalled write must not hold back the reset
+                ser.write(b"\x18")
     except serial.SerialException as e:
         print(f"Serial communication error: {e}")
 
 # ======== MAIN ENTRY POINT ========
 if __name__ == "__main__":
-    gcode = dxf_to_gcode(DXF_FILE)
+    if is_gcode_file_fresh(GCODE_FILE, DXF_FILE):
+        print(f"Using G-code from {GCODE_FILE}.")
+        gcode = read_gcode_file(GCODE_FILE)
+    else:
+        gcode = dxf_to_gcode(DXF_FILE)
+        if gcode:
+            gcode = write_gcode_file(gcode, GCODE_FILE)
     if gcode:
-        send_gcode_to_machine(gcode, SERIAL_PORT, BAUDRATE)
\ No newline at end of file
+        send_gcode_to_machine(prefetch(gcode), SERIAL_PORT, BAUDRATE)
\ No newline at end of file
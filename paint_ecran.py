@@ -32,11 +32,15 @@ import tkinter as tk
 from tkinter import messagebox
 import ezdxf
 import math
+import functools
 from matplotlib.textpath import TextPath
 from matplotlib.font_manager import FontProperties
 import numpy as np
 import socket
 import os
+import queue
+import threading
+from concurrent.futures import Future
 
 # ======== CONFIGURATION ========
 MM_TO_UNITS = 1
@@ -44,15 +48,122 @@ DRAWING_WIDTH = 98
 DRAWING_HEIGHT = 38
 PC_PRINCIPAL_IP = "192.168.1.216"
 PC_PRINCIPAL_PORT = 5001
+ELLIPSE_STEPS = 60  # Vertices of the polygon drawn for a rotated ellipse
+STROKE_TOLERANCE = 1.0  # Max deviation (px) when simplifying a freehand stroke
+RESIZE_SETTLE_MS = 50  # Wait for the canvas size to settle before redrawing the zone
+EXPORT_POLL_MS = 50  # How often the UI checks whether a background DXF send has finished
+SEND_TIMEOUT = 5  # Max wait (s) for the main PC to accept the connection and each send
+
+# ======== GEOMETRY ========
+# Unit circle sampled once for all ellipse redraws
+_ELLIPSE_T = np.linspace(0, 2 * math.pi, ELLIPSE_STEPS, endpoint=False)
+UNIT_CIRCLE_COS = np.cos(_ELLIPSE_T)
+UNIT_CIRCLE_SIN = np.sin(_ELLIPSE_T)
+
+def rotate_points(points, cos_a, sin_a, cx, cy):
+    # Rotate an (N, 2) array of points about (cx, cy) with a single matrix product
+    rotation = np.array([[cos_a, sin_a], [-sin_a, cos_a]])  # Transposed: points are rows
+    center = np.array([cx, cy])
+    return (points - center) @ rotation + center
+
+@functools.lru_cache(maxsize=128)
+def text_polygons(text, fontname, size_pt):
+    # Outline polygons of a text (in points), tessellated once per text, font and size
+    # and already shifted so the anchor sits at the origin: only the export affine is left
+    fp = FontProperties(family=fontname, size=size_pt)
+    tp = TextPath((0, 0), text, prop=fp, size=size_pt)
+    polygons = [np.array(poly) for poly in tp.to_polygons()]
+    all_pts = np.concatenate(polygons)
+    min_x, min_y, max_y = all_pts[:, 0].min(), all_pts[:, 1].min(), all_pts[:, 1].max()
+    shift = np.array([min_x, max_y + (max_y - min_y) * 0.24])
+    for poly in polygons:
+        poly -= shift
+        poly.flags.writeable = False  # Shared by every export
+    return tuple(polygons)
+
+def lwpolyline_vertices(entity):
+    # (N, 2) array of a lightweight polyline's x, y vertices
+    return np.asarray(entity.get_points("xy"), dtype=np.float64).reshape(-1, 2)
+
+def _mark_kept(points, epsilon, keep):
+    # Ramer-Douglas-Peucker: flag in keep the (N, 2) points needed to stay within epsilon of the path
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        inner = points[first + 1:last] - points[first]
+        length = math.hypot(segment[0], segment[1])
+        if length == 0:  # Closed path: measure the distance to the common end point
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > epsilon:
+            farthest += first + 1
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+def simplify_stroke(points, epsilon):
+    # Keep the (N, 2) points of a freehand stroke needed to stay within epsilon of it
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    _mark_kept(points, epsilon, keep)
+    return points[keep]
 
 # ======== DATA STRUCTURES ========
 class Drawable:
+    # Fixed attribute set: no per-instance __dict__
+    __slots__ = ("type", "_coords", "_corners", "canvas_id", "text", "_angle", "_rotation",
+                 "_drawn", "size_mm", "font")
+
     def __init__(self, type_, coords, canvas_id, text=None):
         self.type = type_  # shape type
         self.coords = coords
         self.canvas_id = canvas_id
         self.text = text
         self.angle = 0
+        self._drawn = None  # (canvas_id, item type, options) of the last rotated redraw
+        # Text defaults, overridden per object when the text is created or edited
+        self.size_mm = 5
+        self.font = "DejaVu Sans"
+
+    @property
+    def coords(self):
+        return self._coords
+
+    @coords.setter
+    def coords(self, value):
+        # Points are kept as one contiguous (N, 2) float array, transformed in a single pass
+        self._coords = np.asarray(value, dtype=np.float64).reshape(-1, 2)
+        self._corners = None
+
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        # Rotation in degrees; the cached rotation is recomputed on next use
+        self._angle = value
+        self._rotation = None
+        self._corners = None
+
+    def rotation(self):
+        # Cosine and sine of the rotation, computed once per angle change
+        if self._rotation is None:
+            angle_rad = math.radians(self._angle)
+            self._rotation = (math.cos(angle_rad), math.sin(angle_rad))
+        return self._rotation
+
+    def rotation_transform(self, cx, cy):
+        # Rotation about (cx, cy) as (cos, sin, tx, ty): x' = cos*x - sin*y + tx, y' = sin*x + cos*y + ty
+        cos_a, sin_a = self.rotation()
+        return cos_a, sin_a, cx - cos_a * cx + sin_a * cy, cy - sin_a * cx - cos_a * cy
 
 # ======== MAIN APPLICATION CLASS ========
 class PaintEcran:
@@ -64,35 +175,126 @@ class PaintEcran:
         self.root.bind("<Escape>", lambda e: self.root.attributes("-fullscreen", False))
         self.zone_mode = tk.StringVar(value="rectangle")
         self.tool_mode = tk.StringVar(value="freehand")
+        # Current tool as a Python string, kept in sync so event handlers skip the Tcl variable read
+        self._tool = self.tool_mode.get()
+        self.tool_mode.trace_add("write", self.on_tool_change)
         self.objects = []
-        self.current = None
+        self.current = None  # Freehand stroke being drawn: flat x0, y0, x1, y1... and its canvas line
+        self._current_item = None
+        self._stroke_redraw_pending = False
+        self._preview_id = None  # Line/rectangle/circle preview, moved while dragging
+        self._text_dialog = None  # Built on first use, then hidden and shown again
+        self._logo_export = None  # Logo entities for the DXF export, built on first export
+        self._text_pos = None
         self.start_pos = None
         self.selected_obj = None
+        self._rotation_redraw_pending = False
+        self.control_points = []
+        self._rotation_handle = None  # Rotation handle item and the object it belongs to
+        self._rotation_handle_obj = None
+        self._zone_cache = None  # (x0, y0, x1, y1) of the drawing zone, valid until the canvas is resized
+        self._zone_dirty = True
+        self._zone_refresh = None  # Pending after() id of the zone redraw
+        # DXF write and TCP send, one export at a time on a daemon thread: closing the app never waits for a send
+        self._io_queue = queue.Queue()
+        threading.Thread(target=self.run_io_queue, daemon=True).start()
+        self._font_size_cache = {}  # (size_mm, scale) -> Tk font size, measured once with a probe text
+        # Per-type handle placement and rotated redraw: one dict lookup per call
+        self._handle_dispatch = {
+            "rectangle": self._handle_box,
+            "circle": self._handle_box,
+            "line": self._handle_line,
+            "triangle": self._handle_triangle,
+        }
+        self._redraw_dispatch = {
+            "rectangle": self._redraw_rect,
+            "circle": self._redraw_circle,
+            "line": self._redraw_line,
+            "triangle": self._redraw_triangle,
+            "text": self._redraw_text,
+        }
+        self._center_dispatch = {
+            "rectangle": self._center_of_box,
+            "circle": self._center_of_box,
+            "line": self._center_of_box,
+            "triangle": self._center_of_triangle,
+            "text": self._center_of_text,
+        }
+        self._export_dispatch = {
+            "freehand": self._export_freehand,
+            "line": self._export_line,
+            "rectangle": self._export_rect,
+            "circle": self._export_circle,
+            "text": self._export_text,
+        }
         self.logo_dxf_path = os.path.join(os.path.dirname(__file__), "heig_vd.dxf")
         self.logo_polylines = self.load_logo_dxf(self.logo_dxf_path)
         self.setup_ui()
         self.set_canvas_zone()
-        self.canvas.bind("<Configure>", lambda e: self.set_canvas_zone())
+        self.canvas.bind("<Configure>", self.on_canvas_configure)
 
     def load_logo_dxf(self, dxf_path):
-        """Load logo polylines from DXF file."""
+        """Load logo polylines from DXF file, placed in the drawing zone (mm) and closed."""
+        polylines = self.read_logo_cache(dxf_path)
+        if polylines is None:
+            polylines = self.parse_logo_dxf(dxf_path)
+        # The logo never moves in the zone: scale and place it once, only the canvas mapping
+        # is left for each redraw
+        logo_width_mm = 187
+        logo_height_mm = 140
+        display_width_mm = (30 / 5) * 2
+        display_height_mm = (20 / 5) * 2
+        margin_mm = 2
+        scale = min(display_width_mm / logo_width_mm, display_height_mm / logo_height_mm)
+        zone_width_mm = DRAWING_WIDTH
+        logo_x0_mm = zone_width_mm - display_width_mm - margin_mm
+        logo_y0_mm = margin_mm
+        polylines_mm = []
+        for poly in polylines:
+            if len(poly) < 2:
+                continue
+            poly_mm = poly * scale + (logo_x0_mm, logo_y0_mm)
+            if (poly[0] != poly[-1]).any():
+                poly_mm = np.vstack((poly_mm, poly_mm[:1]))
+            polylines_mm.append(poly_mm)
+        return polylines_mm
+
+    @staticmethod
+    def read_logo_cache(dxf_path):
+        # Logo polylines saved by a previous launch, if the DXF has not changed since
+        cache_path = dxf_path + ".npz"
+        try:
+            if os.path.getmtime(cache_path) < os.path.getmtime(dxf_path):
+                return None
+            with np.load(cache_path) as data:
+                return [data[f"arr_{i}"] for i in range(len(data.files))]
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_logo_dxf(dxf_path):
+        # Read the logo polylines from the DXF and cache them next to it for the next launch
         polylines = []
         try:
             doc = ezdxf.readfile(dxf_path)
             msp = doc.modelspace()
             for e in msp:
                 if e.dxftype() == "LWPOLYLINE":
-                    pts = [(v[0], v[1]) for v in e]
-                    polylines.append(pts)
+                    polylines.append(lwpolyline_vertices(e))
                 elif e.dxftype() == "POLYLINE":
                     pts = [(v.dxf.location.x, v.dxf.location.y) for v in e.vertices]
-                    polylines.append(pts)
+                    polylines.append(np.asarray(pts, dtype=np.float64))
                 elif e.dxftype() == "LINE":
                     start = e.dxf.start
                     end = e.dxf.end
-                    polylines.append([start[:2], end[:2]])
+                    polylines.append(np.array([(start.x, start.y), (end.x, end.y)], dtype=np.float64))
         except Exception as e:
             print(f"DXF logo load error: {e}")
+            return polylines
+        try:
+            np.savez(dxf_path + ".npz", *polylines)
+        except OSError as e:
+            print(f"DXF logo cache error: {e}")
         return polylines
 
     def setup_ui(self):
@@ -147,8 +349,29 @@ class PaintEcran:
         self.set_canvas_zone()
 
     # --- Drawing and coordinate conversion ---
+    def on_tool_change(self, *args):
+        # Tool radio button or Sélection pressed
+        self._tool = self.tool_mode.get()
+
+    def on_canvas_configure(self, event):
+        # Canvas resized: recompute the drawing zone once the burst of Configure events is over
+        if self._zone_refresh is not None:
+            self.canvas.after_cancel(self._zone_refresh)
+        self._zone_refresh = self.canvas.after(RESIZE_SETTLE_MS, self.refresh_zone)
+
+    def refresh_zone(self):
+        # Redraw the zone (which clears the drawing) only if the new size actually moved it
+        self._zone_refresh = None
+        previous = self._zone_cache
+        self._zone_dirty = True
+        if self.get_zone_coords() == previous:
+            return
+        self.set_canvas_zone()
+
     def get_zone_coords(self):
-        # Compute drawing zone coordinates in pixels
+        # Compute drawing zone coordinates in pixels (cached: only a resize changes them)
+        if not self._zone_dirty:
+            return self._zone_cache
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
         margin = 40
@@ -164,12 +387,17 @@ class PaintEcran:
         x1 = x0 + zone_width_px
         y1 = y0 + zone_height_px
         self._current_scale = scale
-        return x0, y0, x1, y1
+        self._zone_cache = (x0, y0, x1, y1)
+        self._zone_dirty = False
+        return self._zone_cache
 
     def set_canvas_zone(self):
         # Draw the main drawing zone and logo
+        self.hide_control_points()
         self.canvas.delete("all")
         self.objects.clear()
+        self.selected_obj = None
+        self._preview_id = None
         x0, y0, x1, y1 = self.get_zone_coords()
         self.canvas.create_rectangle(x0, y0, x1, y1, outline="black", width=2)
         self.draw_logo_on_canvas(x0, y0, x1, y1)
@@ -178,28 +406,12 @@ class PaintEcran:
         # Draw the logo in the drawing zone if available
         if not self.logo_polylines:
             return
-        logo_width_mm = 187
-        logo_height_mm = 140
-        display_width_mm = (30 / 5) * 2
-        display_height_mm = (20 / 5) * 2
-        margin_mm = 2
-        scale = min(display_width_mm / logo_width_mm, display_height_mm / logo_height_mm)
-        zone_width_mm = DRAWING_WIDTH
-        zone_height_mm = DRAWING_HEIGHT
-        logo_x0_mm = zone_width_mm - display_width_mm - margin_mm
-        logo_y0_mm = margin_mm
-        for poly in self.logo_polylines:
-            if len(poly) < 2:
-                continue
-            points = []
-            for px, py in poly:
-                x_mm = logo_x0_mm + (px * scale)
-                y_mm = logo_y0_mm + (py * scale)
-                x_canvas, y_canvas = self.real_to_canvas(x_mm, y_mm)
-                points.append((x_canvas, y_canvas))
-            if points[0] != points[-1]:
-                points.append(points[0])
-            self.canvas.create_line(points, fill="#888", width=2, tags="logo", smooth=False)
+        scale = self._current_scale
+        for poly_mm in self.logo_polylines:
+            points = np.empty(poly_mm.shape)
+            points[:, 0] = x0 + poly_mm[:, 0] * scale
+            points[:, 1] = y1 - poly_mm[:, 1] * scale
+            self.canvas.create_line(points.ravel().tolist(), fill="#888", width=2, tags="logo", smooth=False)
 
     def canvas_to_real(self, x, y):
         # Convert canvas coordinates (pixels) to real-world millimeters
@@ -209,6 +421,15 @@ class PaintEcran:
         real_y = (y1 - y) / scale
         return real_x, real_y
 
+    def canvas_to_real_batch(self, points):
+        # Convert an (N, 2) array of canvas points to real-world millimeters in one pass
+        x0, y0, x1, y1 = self.get_zone_coords()
+        scale = self._current_scale
+        real = np.empty(points.shape)
+        real[:, 0] = (points[:, 0] - x0) / scale
+        real[:, 1] = (y1 - points[:, 1]) / scale
+        return real
+
     def real_to_canvas(self, rx, ry):
         # Convert real-world millimeters to canvas coordinates (pixels)
         x0, y0, x1, y1 = self.get_zone_coords()
@@ -220,155 +441,192 @@ class PaintEcran:
     # --- Event handlers for drawing and editing ---
     def on_click(self, event):
         # Handle mouse click for drawing or selecting objects
-        tool = self.tool_mode.get()
+        tool = self._tool
         self.start_pos = (event.x, event.y)
         if tool == "freehand":
-            self.current = [(event.x, event.y)]
+            # The whole stroke is one canvas line, extended as the pointer moves
+            self.current = [event.x, event.y]
+            self._current_item = self.canvas.create_line(event.x, event.y, event.x, event.y, fill="blue")
             self.hide_control_points()
         elif tool == "text":
             self.hide_control_points()
-            dialog = tk.Toplevel(self.root)
-            dialog.title("Texte")
-            dialog.transient(self.root)
-            dialog.geometry("+20+20")
-            dialog.wait_visibility()
-            dialog.grab_set()
-            tk.Label(dialog, text="Texte :", font=("Arial", 22)).pack(pady=(20,5))
-            text_var = tk.StringVar()
-            text_entry = tk.Entry(dialog, textvariable=text_var, font=("Arial", 28), width=18)
-            text_entry.pack(ipadx=30, ipady=10, pady=10)
-            text_entry.focus_set()
-            tk.Label(dialog, text="Taille (mm) :", font=("Arial", 18)).pack(pady=(10,0))
-            size_var = tk.StringVar(value="5")
-            size_entry = tk.Entry(dialog, textvariable=size_var, font=("Arial", 22), width=8)
-            size_entry.pack(ipadx=10, ipady=5, pady=10)
-            is_upper = [False]
-            current_field = [text_entry]
-            def insert_char(c):
-                current_field[0].insert(tk.END, c)
-                current_field[0].focus_set()
-            def backspace():
-                entry = current_field[0]
-                val = entry.get()
-                entry.delete(0, tk.END)
-                entry.insert(0, val[:-1])
-                entry.focus_set()
-            def space():
-                current_field[0].insert(tk.END, ' ')
-                current_field[0].focus_set()
-            def toggle_case():
-                is_upper[0] = not is_upper[0]
-                update_keyboard()
-            def switch_field():
-                if current_field[0] == text_entry:
-                    current_field[0] = size_entry
-                else:
-                    current_field[0] = text_entry
-                current_field[0].focus_set()
-            keyboard_frame = tk.Frame(dialog)
-            keyboard_frame.pack(pady=10)
-            letter_keys = ['a','z','e','r','t','y','u','i','o','p',
-                           'q','s','d','f','g','h','j','k','l','m',
-                           'w','x','c','v','b','n']
-            number_keys = ['1','2','3','4','5','6','7','8','9','0']
-            key_buttons = []
-            def update_keyboard():
-                for btn, key in key_buttons:
-                    if key.isalpha():
-                        btn.config(text=key.upper() if is_upper[0] else key.lower(),
-                                   command=lambda c=(key.upper() if is_upper[0] else key.lower()): insert_char(c))
-            row_frame = tk.Frame(keyboard_frame)
-            row_frame.pack()
-            for key in number_keys:
-                btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
-                btn.pack(side=tk.LEFT, padx=2, pady=2)
-                key_buttons.append((btn, key))
-            row_frame = tk.Frame(keyboard_frame)
-            row_frame.pack()
-            for key in letter_keys[:10]:
-                btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
-                btn.pack(side=tk.LEFT, padx=2, pady=2)
-                key_buttons.append((btn, key))
-            row_frame = tk.Frame(keyboard_frame)
-            row_frame.pack()
-            for key in letter_keys[10:20]:
-                btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
-                btn.pack(side=tk.LEFT, padx=2, pady=2)
-                key_buttons.append((btn, key))
-            row_frame = tk.Frame(keyboard_frame)
-            row_frame.pack()
-            maj_btn = tk.Button(row_frame, text='Maj', width=5, height=2, font=("Arial", 18), command=toggle_case)
-            maj_btn.pack(side=tk.LEFT, padx=2, pady=2)
-            for key in letter_keys[20:]:
-                btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
-                btn.pack(side=tk.LEFT, padx=2, pady=2)
-                key_buttons.append((btn, key))
-            tk.Button(row_frame, text='⌫', width=4, height=2, font=("Arial", 18), command=backspace).pack(side=tk.LEFT, padx=2, pady=2)
-            tk.Button(row_frame, text='Champ suivant', width=12, height=2, font=("Arial", 18), command=switch_field).pack(side=tk.LEFT, padx=2, pady=2)
-            row_frame = tk.Frame(keyboard_frame)
-            row_frame.pack()
-            tk.Button(row_frame, text='Espace', width=20, height=2, font=("Arial", 18), command=space).pack(side=tk.LEFT, padx=2, pady=2)
-            update_keyboard()
-            btn_frame = tk.Frame(dialog)
-            btn_frame.pack(pady=20)
-            def confirm():
-                text = text_var.get()
-                try:
-                    size_mm = float(size_var.get())
-                    if size_mm <= 0:
-                        raise ValueError
-                except ValueError:
-                    size_entry.config(bg="#ffcccc")
-                    return
-                size_px = self.mm_to_tk_font_size(size_mm)
-                font_name = "DejaVu Sans"
-                if text:
-                    canvas_id = self.canvas.create_text(
-                        event.x, event.y,
-                        text=text,
-                        font=(font_name, size_px),
-                        anchor="nw"
-                    )
-                    drawable = Drawable("text", [(event.x, event.y)], canvas_id, text)
-                    drawable.size_mm = size_mm
-                    drawable.font = font_name
-                    self.objects.append(drawable)
-                dialog.destroy()
-            def cancel():
-                dialog.destroy()
-            tk.Button(btn_frame, text="OK", command=confirm, font=("Arial", 20), width=8, bg="#a3cef1").pack(side=tk.LEFT, padx=10)
-            tk.Button(btn_frame, text="Annuler", command=cancel, font=("Arial", 20), width=8, bg="#bde0fe").pack(side=tk.LEFT, padx=10)
-            dialog.wait_window(dialog)
+            self.show_text_dialog(event.x, event.y)
         elif tool == "select":
             self.select_object(event.x, event.y)
 
+    def show_text_dialog(self, x, y):
+        # Ask for a new text at (x, y); the dialog and its keyboard are built once, then reused
+        if self._text_dialog is None:
+            self.build_text_dialog()
+        dialog = self._text_dialog
+        self._text_pos = (x, y)
+        dialog.deiconify()
+        dialog.wait_visibility()
+        dialog.grab_set()
+        self._reset_text_dialog()
+
+    def build_text_dialog(self):
+        # Create the (hidden) text dialog with its on-screen keyboard
+        dialog = tk.Toplevel(self.root)
+        dialog.withdraw()
+        dialog.title("Texte")
+        dialog.transient(self.root)
+        dialog.geometry("+20+20")
+        tk.Label(dialog, text="Texte :", font=("Arial", 22)).pack(pady=(20,5))
+        text_var = tk.StringVar()
+        text_entry = tk.Entry(dialog, textvariable=text_var, font=("Arial", 28), width=18)
+        text_entry.pack(ipadx=30, ipady=10, pady=10)
+        tk.Label(dialog, text="Taille (mm) :", font=("Arial", 18)).pack(pady=(10,0))
+        size_var = tk.StringVar(value="5")
+        size_entry = tk.Entry(dialog, textvariable=size_var, font=("Arial", 22), width=8)
+        size_entry.pack(ipadx=10, ipady=5, pady=10)
+        size_bg = size_entry.cget("bg")
+        is_upper = [False]
+        current_field = [text_entry]
+        def insert_char(c):
+            current_field[0].insert(tk.END, c)
+            current_field[0].focus_set()
+        def backspace():
+            entry = current_field[0]
+            val = entry.get()
+            entry.delete(0, tk.END)
+            entry.insert(0, val[:-1])
+            entry.focus_set()
+        def space():
+            current_field[0].insert(tk.END, ' ')
+            current_field[0].focus_set()
+        def toggle_case():
+            is_upper[0] = not is_upper[0]
+            update_keyboard()
+        def switch_field():
+            if current_field[0] == text_entry:
+                current_field[0] = size_entry
+            else:
+                current_field[0] = text_entry
+            current_field[0].focus_set()
+        keyboard_frame = tk.Frame(dialog)
+        keyboard_frame.pack(pady=10)
+        letter_keys = ['a','z','e','r','t','y','u','i','o','p',
+                       'q','s','d','f','g','h','j','k','l','m',
+                       'w','x','c','v','b','n']
+        number_keys = ['1','2','3','4','5','6','7','8','9','0']
+        key_buttons = []
+        def update_keyboard():
+            for btn, key in key_buttons:
+                if key.isalpha():
+                    btn.config(text=key.upper() if is_upper[0] else key.lower(),
+                               command=lambda c=(key.upper() if is_upper[0] else key.lower()): insert_char(c))
+        row_frame = tk.Frame(keyboard_frame)
+        row_frame.pack()
+        for key in number_keys:
+            btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
+            btn.pack(side=tk.LEFT, padx=2, pady=2)
+            key_buttons.append((btn, key))
+        row_frame = tk.Frame(keyboard_frame)
+        row_frame.pack()
+        for key in letter_keys[:10]:
+            btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
+            btn.pack(side=tk.LEFT, padx=2, pady=2)
+            key_buttons.append((btn, key))
+        row_frame = tk.Frame(keyboard_frame)
+        row_frame.pack()
+        for key in letter_keys[10:20]:
+            btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
+            btn.pack(side=tk.LEFT, padx=2, pady=2)
+            key_buttons.append((btn, key))
+        row_frame = tk.Frame(keyboard_frame)
+        row_frame.pack()
+        maj_btn = tk.Button(row_frame, text='Maj', width=5, height=2, font=("Arial", 18), command=toggle_case)
+        maj_btn.pack(side=tk.LEFT, padx=2, pady=2)
+        for key in letter_keys[20:]:
+            btn = tk.Button(row_frame, text=key, width=4, height=2, font=("Arial", 18), command=lambda c=key: insert_char(c))
+            btn.pack(side=tk.LEFT, padx=2, pady=2)
+            key_buttons.append((btn, key))
+        tk.Button(row_frame, text='⌫', width=4, height=2, font=("Arial", 18), command=backspace).pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(row_frame, text='Champ suivant', width=12, height=2, font=("Arial", 18), command=switch_field).pack(side=tk.LEFT, padx=2, pady=2)
+        row_frame = tk.Frame(keyboard_frame)
+        row_frame.pack()
+        tk.Button(row_frame, text='Espace', width=20, height=2, font=("Arial", 18), command=space).pack(side=tk.LEFT, padx=2, pady=2)
+        update_keyboard()
+        btn_frame = tk.Frame(dialog)
+        btn_frame.pack(pady=20)
+        def close():
+            dialog.grab_release()
+            dialog.withdraw()
+        def confirm():
+            text = text_var.get()
+            try:
+                size_mm = float(size_var.get())
+                if size_mm <= 0:
+                    raise ValueError
+            except ValueError:
+                size_entry.config(bg="#ffcccc")
+                return
+            size_px = self.mm_to_tk_font_size(size_mm)
+            font_name = "DejaVu Sans"
+            if text:
+                x, y = self._text_pos
+                canvas_id = self.canvas.create_text(
+                    x, y,
+                    text=text,
+                    font=(font_name, size_px),
+                    anchor="nw"
+                )
+                drawable = Drawable("text", [(x, y)], canvas_id, text)
+                drawable.size_mm = size_mm
+                drawable.font = font_name
+                self.objects.append(drawable)
+            close()
+        def reset():
+            # Same state as a freshly opened dialog: empty text, 5 mm, lower case, text field focused
+            text_var.set("")
+            size_var.set("5")
+            size_entry.config(bg=size_bg)
+            if is_upper[0]:
+                toggle_case()
+            current_field[0] = text_entry
+            text_entry.focus_set()
+        tk.Button(btn_frame, text="OK", command=confirm, font=("Arial", 20), width=8, bg="#a3cef1").pack(side=tk.LEFT, padx=10)
+        tk.Button(btn_frame, text="Annuler", command=close, font=("Arial", 20), width=8, bg="#bde0fe").pack(side=tk.LEFT, padx=10)
+        dialog.protocol("WM_DELETE_WINDOW", close)  # Hide rather than destroy: the dialog is reused
+        self._text_dialog = dialog
+        self._reset_text_dialog = reset
+
     def on_drag(self, event):
         # Handle mouse drag for drawing or moving objects
-        tool = self.tool_mode.get()
+        tool = self._tool
         if tool == "freehand" and self.current:
-            x1, y1 = self.current[-1]
-            x2, y2 = event.x, event.y
-            line = self.canvas.create_line(x1, y1, x2, y2, fill="blue")
-            self.current.append((x2, y2))
+            self.current += (event.x, event.y)
+            # Every point is kept, but the canvas line is updated once per idle cycle
+            if not self._stroke_redraw_pending:
+                self._stroke_redraw_pending = True
+                self.canvas.after_idle(self.apply_stroke_redraw, self._current_item, self.current)
         elif tool in ("line", "rectangle", "circle") and self.start_pos:
-            self.canvas.delete("preview")
             x0, y0 = self.start_pos
-            if tool == "line":
-                self.canvas.create_line(x0, y0, event.x, event.y, fill="blue", tags="preview")
+            if self._preview_id is not None:
+                self.canvas.coords(self._preview_id, x0, y0, event.x, event.y)
+            elif tool == "line":
+                self._preview_id = self.canvas.create_line(x0, y0, event.x, event.y, fill="blue", tags="preview")
             elif tool == "rectangle":
-                self.canvas.create_rectangle(x0, y0, event.x, event.y, outline="blue", tags="preview")
+                self._preview_id = self.canvas.create_rectangle(x0, y0, event.x, event.y, outline="blue", tags="preview")
             elif tool == "circle":
-                self.canvas.create_oval(x0, y0, event.x, event.y, outline="blue", tags="preview")
+                self._preview_id = self.canvas.create_oval(x0, y0, event.x, event.y, outline="blue", tags="preview")
         elif tool == "select" and self.selected_obj and hasattr(self, '_drag_data') and self._drag_data:
             dx = event.x - self._drag_data['x']
             dy = event.y - self._drag_data['y']
             self.canvas.move(self.selected_obj.canvas_id, dx, dy)
-            self.selected_obj.coords = [(x+dx, y+dy) for (x, y) in self.selected_obj.coords]
+            self.selected_obj.coords = self.selected_obj.coords + (dx, dy)
             self._drag_data = {'x': event.x, 'y': event.y}
 
+    def apply_stroke_redraw(self, item, flat):
+        # Show all the points collected since the last update of the stroke being drawn
+        self._stroke_redraw_pending = False
+        if flat is self.current:  # A finished stroke was already drawn simplified by on_release
+            self.canvas.coords(item, flat)
+
     def on_release(self, event):
         # Handle mouse release to finalize drawing
-        tool = self.tool_mode.get()
+        tool = self._tool
         if self.start_pos:
             x0, y0 = self.start_pos
         else:
@@ -376,19 +634,26 @@ class PaintEcran:
         x1, y1 = event.x, event.y
 
         if tool == "freehand" and self.current:
-            canvas_id = None
-            for i in range(1, len(self.current)):
-                x1_, y1_ = self.current[i - 1]
-                x2_, y2_ = self.current[i]
-                canvas_id = self.canvas.create_line(x1_, y1_, x2_, y2_, fill="blue")
-            self.objects.append(Drawable("freehand", self.current[:], canvas_id))
+            # Touch input gives several samples per pixel: keep only those the shape needs
+            points = np.asarray(self.current, dtype=np.float64).reshape(-1, 2)
+            points = simplify_stroke(points, STROKE_TOLERANCE)
+            if len(points) > 1:
+                self.canvas.coords(self._current_item, points.ravel().tolist())
+            self.objects.append(Drawable("freehand", points, self._current_item))
             self.current = None
+            self._current_item = None
 
         elif tool in ("line", "rectangle", "circle"):
-            self.canvas.delete("preview")
             canvas_id = None
             coords = []
-            if tool == "line":
+            if self._preview_id is not None:
+                # The preview becomes the final shape
+                canvas_id = self._preview_id
+                self._preview_id = None
+                self.canvas.coords(canvas_id, x0, y0, x1, y1)
+                self.canvas.itemconfig(canvas_id, tags="")
+                coords = [(x0, y0), (x1, y1)]
+            elif tool == "line":
                 canvas_id = self.canvas.create_line(x0, y0, x1, y1, fill="blue")
                 coords = [(x0, y0), (x1, y1)]
             elif tool == "rectangle":
@@ -403,15 +668,18 @@ class PaintEcran:
 
     def select_object(self, x, y):
         # Select an object under the cursor
-        # Deselect all objects
-        for obj in self.objects:
+        # Deselect the previous selection: it is the only highlighted object
+        obj = self.selected_obj
+        if obj is not None:
             if obj.type in ("line", "rectangle", "circle", "triangle", "freehand"):
                 self.canvas.itemconfig(obj.canvas_id, width=1, tags="")
             else:
                 self.canvas.itemconfig(obj.canvas_id, tags="")
         # Tolerance zone for touch screen (20x20 px around the point)
         tolerance = 20
-        overlapping = self.canvas.find_overlapping(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        # Tk does the geometric test (exact for text and rotated polygons); a set makes the
+        # per-object membership check below constant time
+        overlapping = set(self.canvas.find_overlapping(x - tolerance, y - tolerance, x + tolerance, y + tolerance))
         for obj in reversed(self.objects):
             if obj.canvas_id in overlapping:
                 self.selected_obj = obj
@@ -464,7 +732,7 @@ class PaintEcran:
         text_entry.pack()
 
         tk.Label(dialog, text="Taille (mm) :").pack()
-        size_var = tk.StringVar(value=str(getattr(obj, "size_mm", 10)))
+        size_var = tk.StringVar(value=str(obj.size_mm))
         size_entry = tk.Entry(dialog, textvariable=size_var)
         size_entry.pack()
 
@@ -665,12 +933,10 @@ class PaintEcran:
                 messagebox.showerror("Erreur", "Valeur(s) invalide(s).")
                 return
             self.canvas.delete(obj.canvas_id)
-            new_coords = [(x+dx, y+dy) for (x, y) in obj.coords]
+            new_coords = obj.coords + (dx, dy)
             canvas_id = None
-            for i in range(1, len(new_coords)):
-                x1, y1 = new_coords[i-1]
-                x2, y2 = new_coords[i]
-                canvas_id = self.canvas.create_line(x1, y1, x2, y2, fill="blue")
+            if len(new_coords) >= 2:
+                canvas_id = self.canvas.create_line(new_coords.ravel().tolist(), fill="blue")
             obj.coords = new_coords
             obj.canvas_id = canvas_id
             dialog.destroy()
@@ -697,83 +963,123 @@ class PaintEcran:
 
 
         for obj in self.objects:
-            if obj.type == "freehand":
-                pts = [(x + offset_x, y + offset_y) for x, y in [self.canvas_to_real(px, py) for px, py in obj.coords]]
-                msp.add_lwpolyline(pts)
-            elif obj.type == "line":
-                x0, y0 = self.canvas_to_real(*obj.coords[0])
-                x1, y1 = self.canvas_to_real(*obj.coords[1])
-                msp.add_line((x0 + offset_x, y0 + offset_y), (x1 + offset_x, y1 + offset_y))
-            elif obj.type == "rectangle":
-                x0, y0 = self.canvas_to_real(*obj.coords[0])
-                x1, y1 = self.canvas_to_real(*obj.coords[1])
-                cx = (x0 + x1) / 2
-                cy = (y0 + y1) / 2
-                angle = getattr(obj, 'angle', 0)
-                angle_rad = math.radians(-angle) 
-                pts = [
-                    (x0, y0), (x1, y0), (x1, y1), (x0, y1)
-                ]
-                rot_pts = [
-                    (
-                        cx + math.cos(angle_rad) * (px - cx) - math.sin(angle_rad) * (py - cy) + offset_x,
-                        cy + math.sin(angle_rad) * (px - cx) + math.cos(angle_rad) * (py - cy) + offset_y
-                    ) for (px, py) in pts
-                ]
-                msp.add_lwpolyline(rot_pts + [rot_pts[0]], close=True)
-            elif obj.type == "circle":
-                x0, y0 = obj.coords[0]
-                x1, y1 = obj.coords[1]
-                cx = (x0 + x1) / 2
-                cy = (y0 + y1) / 2
-                cx_real, cy_real = self.canvas_to_real(cx, cy)
-                rx_canvas = abs(x1 - x0) / 2
-                ry_canvas = abs(y1 - y0) / 2
-                scale = self._current_scale
-                rx = rx_canvas / scale  
-                ry = ry_canvas / scale 
-                angle = getattr(obj, 'angle', 0)
-                if abs(rx - ry) < 1e-3:
-                    msp.add_circle((cx_real + offset_x, cy_real + offset_y), rx)
-                else:
-                    angle_rad = math.radians(-angle)
-                    if ry > rx:
-                        major_axis = (ry * math.cos(angle_rad + math.pi/2), ry * math.sin(angle_rad + math.pi/2))
-                        ratio = rx / ry if ry != 0 else 1
-                    else:
-                        major_axis = (rx * math.cos(angle_rad), rx * math.sin(angle_rad))
-                        ratio = ry / rx if rx != 0 else 1
-                    msp.add_ellipse(
-                        center=(cx_real + offset_x, cy_real + offset_y),
-                        major_axis=major_axis,
-                        ratio=ratio
-                    )
-            elif obj.type == "text":
-                x, y = self.canvas_to_real(*obj.coords[0])
-                height = getattr(obj, "size_mm", 5)
-                fontname = getattr(obj, "font", "DejaVu Sans")
-                size_pt = height / 0.41
-                try:
-                    fp = FontProperties(family=fontname, size=size_pt)
-                    tp = TextPath((0, 0), obj.text, prop=fp, size=size_pt)
-                    all_pts = np.concatenate([np.array(poly) for poly in tp.to_polygons()])
-                    min_x = np.min(all_pts[:, 0])
-                    max_y = np.max(all_pts[:, 1])
-                    min_y = np.min(all_pts[:, 1])
-                    bbox_height = max_y - min_y
-                    for poly in tp.to_polygons():
-                        poly = np.array(poly)
-                        poly[:, 0] -= min_x
-                        poly[:, 1] -= max_y
-                        poly[:, 1] -= bbox_height * 0.24
-                        poly[:, 0] = poly[:, 0] * 0.3528 + x + offset_x
-                        poly[:, 1] = poly[:, 1] * 0.3528 + y + offset_y
-                        msp.add_lwpolyline([tuple(pt) for pt in poly], close=True)
-                except Exception as e:
-                    msp.add_text(obj.text, dxfattribs={"height": height, "insert": (x + offset_x, y + offset_y)})
+            export = self._export_dispatch.get(obj.type)
+            if export is not None:
+                export(msp, obj, offset_x, offset_y)
 
         # Add logo to exported DXF
         try:
+            offset = (offset_x, offset_y)
+            for kind, pts, closed in self.logo_export_entities():
+                pts = (pts + offset).tolist()
+                if kind == "LINE":
+                    msp.add_line(pts[0], pts[1])
+                else:
+                    msp.add_lwpolyline(pts, close=closed)
+        except Exception as e:
+            print(f"Erreur ajout logo DXF export: {e}")
+
+        # Write and send on the I/O thread: the UI stays responsive during the TCP transfer
+        future = Future()
+        self._io_queue.put((future, doc, "dxf3.dxf"))
+        self.root.after(EXPORT_POLL_MS, self.poll_export, future)
+
+    def run_io_queue(self):
+        # I/O thread: run the queued exports in turn, handing each outcome to its future
+        while True:
+            future, doc, filepath = self._io_queue.get()
+            try:
+                future.set_result(self.save_and_send_dxf(doc, filepath))
+            except Exception as e:
+                future.set_exception(e)
+
+    def save_and_send_dxf(self, doc, filepath):
+        # Runs on the I/O thread: must not touch Tk. Exports are queued, so a file is never overwritten mid-send
+        doc.saveas(filepath)
+        return self.send_dxf_to_pc(filepath, PC_PRINCIPAL_IP, PC_PRINCIPAL_PORT)
+
+    def poll_export(self, future):
+        # Report the outcome of a background export once it is done (Tk calls stay on the main thread)
+        if not future.done():
+            self.root.after(EXPORT_POLL_MS, self.poll_export, future)
+            return
+        try:
+            sent = future.result()
+        except Exception as e:
+            notif = tk.Toplevel(self.root)
+            notif.title("Erreur export")
+            notif.geometry(f"+{self.root.winfo_rootx() + 400}+{self.root.winfo_rooty() + 400}")
+            tk.Label(notif, text=f"Erreur export : {e}", font=("Arial", 16), fg="red").pack(padx=30, pady=30)
+            notif.after(2000, notif.destroy)
+            return
+        if sent:
+            notif = tk.Toplevel(self.root)
+            notif.title("Envoi")
+            notif.geometry(f"+{self.root.winfo_rootx() + 400}+{self.root.winfo_rooty() + 400}")
+            tk.Label(notif, text="Fichier envoyé à la graveuse !", font=("Arial", 20)).pack(padx=30, pady=30)
+            notif.after(1200, notif.destroy) 
+
+    def _export_freehand(self, msp, obj, offset_x, offset_y):
+        pts = self.canvas_to_real_batch(obj.coords)
+        pts += (offset_x, offset_y)
+        msp.add_lwpolyline(pts.tolist())
+
+    def _export_line(self, msp, obj, offset_x, offset_y):
+        start, end = self.canvas_to_real_batch(obj.coords) + (offset_x, offset_y)
+        msp.add_line(start.tolist(), end.tolist())
+
+    def _export_rect(self, msp, obj, offset_x, offset_y):
+        # Corners as drawn on the canvas, converted and offset in one pass
+        rot_pts = self.canvas_to_real_batch(self._rotated_corners(obj))
+        rot_pts += (offset_x, offset_y)
+        rot_pts = rot_pts.tolist()
+        msp.add_lwpolyline(rot_pts + [rot_pts[0]], close=True)
+
+    def _export_circle(self, msp, obj, offset_x, offset_y):
+        x0, y0 = obj.coords[0]
+        x1, y1 = obj.coords[1]
+        cx = (x0 + x1) / 2
+        cy = (y0 + y1) / 2
+        cx_real, cy_real = self.canvas_to_real(cx, cy)
+        rx_canvas = abs(x1 - x0) / 2
+        ry_canvas = abs(y1 - y0) / 2
+        scale = self._current_scale
+        rx = rx_canvas / scale  
+        ry = ry_canvas / scale 
+        angle = obj.angle
+        if abs(rx - ry) < 1e-3:
+            msp.add_circle((cx_real + offset_x, cy_real + offset_y), rx)
+        else:
+            angle_rad = math.radians(-angle)
+            if ry > rx:
+                major_axis = (ry * math.cos(angle_rad + math.pi/2), ry * math.sin(angle_rad + math.pi/2))
+                ratio = rx / ry if ry != 0 else 1
+            else:
+                major_axis = (rx * math.cos(angle_rad), rx * math.sin(angle_rad))
+                ratio = ry / rx if rx != 0 else 1
+            msp.add_ellipse(
+                center=(cx_real + offset_x, cy_real + offset_y),
+                major_axis=major_axis,
+                ratio=ratio
+            )
+
+    def _export_text(self, msp, obj, offset_x, offset_y):
+        x, y = self.canvas_to_real(*obj.coords[0])
+        height = obj.size_mm
+        fontname = obj.font
+        size_pt = height / 0.41
+        try:
+            polygons = text_polygons(obj.text, fontname, size_pt)
+            anchor = np.array([x + offset_x, y + offset_y])
+            for poly in polygons:
+                poly = poly * 0.3528 + anchor
+                msp.add_lwpolyline([tuple(pt) for pt in poly], close=True)
+        except Exception as e:
+            msp.add_text(obj.text, dxfattribs={"height": height, "insert": (x + offset_x, y + offset_y)})
+
+    def logo_export_entities(self):
+        # Logo entities placed in the zone (mm) for export, read from the DXF on the first export only
+        if self._logo_export is None:
             logo_doc = ezdxf.readfile(self.logo_dxf_path)
             logo_msp = logo_doc.modelspace()
             logo_width_mm = 187
@@ -784,52 +1090,35 @@ class PaintEcran:
             scale = min(display_width_mm / logo_width_mm, display_height_mm / logo_height_mm)
             zone_width_mm = DRAWING_WIDTH
             zone_height_mm = DRAWING_HEIGHT
-            logo_x0_mm = zone_width_mm - display_width_mm - margin_mm + offset_x
-            logo_y0_mm = margin_mm + offset_y
+            logo_x0_mm = zone_width_mm - display_width_mm - margin_mm
+            logo_y0_mm = margin_mm
+            offset = np.array([logo_x0_mm, logo_y0_mm])
+            entities = []
             for e in logo_msp:
                 if e.dxftype() == "LWPOLYLINE":
-                    pts = [(logo_x0_mm + v[0]*scale, logo_y0_mm + v[1]*scale) for v in e]
-                    msp.add_lwpolyline(pts, close=e.closed)
+                    entities.append(("LWPOLYLINE", lwpolyline_vertices(e) * scale + offset, e.closed))
                 elif e.dxftype() == "POLYLINE":
-                    pts = [(logo_x0_mm + v.dxf.location.x*scale, logo_y0_mm + v.dxf.location.y*scale) for v in e.vertices]
+                    pts = np.array([(v.dxf.location.x, v.dxf.location.y) for v in e.vertices], dtype=np.float64)
                     closed = bool(e.dxf.flags & 1)
-                    msp.add_lwpolyline(pts, close=closed)
+                    entities.append(("POLYLINE", pts * scale + offset, closed))
                 elif e.dxftype() == "LINE":
                     start = e.dxf.start
                     end = e.dxf.end
-                    start_pt = (logo_x0_mm + start[0]*scale, logo_y0_mm + start[1]*scale)
-                    end_pt = (logo_x0_mm + end[0]*scale, logo_y0_mm + end[1]*scale)
-                    msp.add_line(start_pt, end_pt)
-        except Exception as e:
-            print(f"Erreur ajout logo DXF export: {e}")
-
-        try:
-            doc.saveas("dxf3.dxf")
-            if self.send_dxf_to_pc("dxf3.dxf", PC_PRINCIPAL_IP, PC_PRINCIPAL_PORT):
-                notif = tk.Toplevel(self.root)
-                notif.title("Envoi")
-                notif.geometry(f"+{self.root.winfo_rootx() + 400}+{self.root.winfo_rooty() + 400}")
-                tk.Label(notif, text="Fichier envoyé à la graveuse !", font=("Arial", 20)).pack(padx=30, pady=30)
-                notif.after(1200, notif.destroy) 
-        except Exception as e:
-            notif = tk.Toplevel(self.root)
-            notif.title("Erreur export")
-            notif.geometry(f"+{self.root.winfo_rootx() + 400}+{self.root.winfo_rooty() + 400}")
-            tk.Label(notif, text=f"Erreur export : {e}", font=("Arial", 16), fg="red").pack(padx=30, pady=30)
-            notif.after(2000, notif.destroy)
+                    pts = np.array([(start.x, start.y), (end.x, end.y)], dtype=np.float64)
+                    entities.append(("LINE", pts * scale + offset, False))
+            self._logo_export = entities
+        return self._logo_export
 
     @staticmethod
     def send_dxf_to_pc(filepath, pc_ip, port=5001):
         # Send the DXF file to the main PC via TCP
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.settimeout(SEND_TIMEOUT)
                 s.connect((pc_ip, port))
                 with open(filepath, 'rb') as f:
-                    while True:
-                        data = f.read(4096)
-                        if not data:
-                            break
-                        s.sendall(data)
+                    # Kernel-side copy (sendfile) where available, large sendall() chunks otherwise
+                    s.sendfile(f)
             return True
         except Exception as e:
             print(f"Erreur d'envoi TCP : {e}")
@@ -838,70 +1127,74 @@ class PaintEcran:
     # --- Control points and rotation ---
     def show_control_points(self, obj):
         # Show control points for resizing/rotating the selected object
-        self.hide_control_points()
-        self.control_points = []
-        import math
         # Rectangle, circle, line, triangle get rotation handle
-        if obj.type in ("rectangle", "circle", "line", "triangle"):
-            cx, cy = self.get_object_center(obj)
-            angle_rad = math.radians(getattr(obj, 'angle', 0))
-            if obj.type == "rectangle" or obj.type == "circle":
-                (x0, y0), (x1, y1) = obj.coords
-                pts = [
-                    (x0, y0), (x1, y0), (x1, y1), (x0, y1)
-                ]
-                rot_pts = [
-                    (
-                        cx + math.cos(angle_rad) * (px - cx) - math.sin(angle_rad) * (py - cy),
-                        cy + math.sin(angle_rad) * (px - cx) + math.cos(angle_rad) * (py - cy)
-                    ) for (px, py) in pts
-                ]
-                top_mid = (
-                    (rot_pts[0][0] + rot_pts[1][0]) / 2,
-                    (rot_pts[0][1] + rot_pts[1][1]) / 2
-                )
-                dx = top_mid[0] - cx
-                dy = top_mid[1] - cy
-                norm = math.hypot(dx, dy)
-                if norm == 0:
-                    norm = 1
-                dx /= norm
-                dy /= norm
-                rot_x = top_mid[0] + (-dy) * 30
-                rot_y = top_mid[1] + (dx) * 30
-            elif obj.type == "line":
-                (x0, y0), (x1, y1) = obj.coords
-                top_mid = ((x0 + x1) / 2, (y0 + y1) / 2)
-                dx = x1 - x0
-                dy = y1 - y0
-                norm = math.hypot(dx, dy)
-                if norm == 0:
-                    norm = 1
-                dx /= norm
-                dy /= norm
-                perp_x = -dy
-                perp_y = dx
-                rot_x = top_mid[0] + perp_x * 30
-                rot_y = top_mid[1] + perp_y * 30
-            elif obj.type == "triangle":
-                pts = obj.coords
-                top_mid = ((pts[0][0] + pts[1][0]) / 2, (pts[0][1] + pts[1][1]) / 2)
-                dx = top_mid[0] - cx
-                dy = top_mid[1] - cy
-                norm = math.hypot(dx, dy)
-                if norm == 0:
-                    norm = 1
-                dx /= norm
-                dy /= norm
-                rot_x = top_mid[0] + (-dy) * 30
-                rot_y = top_mid[1] + (dx) * 30
-            elif obj.type == "text":
-                (x, y) = obj.coords[0]
-                rot_x = x
-                rot_y = y - 30
-            rot_cp = self.canvas.create_oval(rot_x-8, rot_y-8, rot_x+8, rot_y+8, fill="orange", outline="black", tags="rotation_point")
-            self.canvas.tag_bind(rot_cp, '<Button-1>', lambda e: self.start_rotate_control_point(e, obj))
-            self.control_points.append(rot_cp)
+        handle_position = self._handle_dispatch.get(obj.type)
+        if handle_position is None:
+            self.hide_control_points()
+            return
+        rot_x, rot_y = handle_position(obj)
+        if self._rotation_handle is not None and self._rotation_handle_obj is obj:
+            # Same object (e.g. while rotating): move the existing handle instead of recreating it
+            self.canvas.coords(self._rotation_handle, rot_x-8, rot_y-8, rot_x+8, rot_y+8)
+            return
+        self.hide_control_points()
+        rot_cp = self.canvas.create_oval(rot_x-8, rot_y-8, rot_x+8, rot_y+8, fill="orange", outline="black", tags="rotation_point")
+        self.canvas.tag_bind(rot_cp, '<Button-1>', lambda e: self.start_rotate_control_point(e, obj))
+        self.control_points.append(rot_cp)
+        self._rotation_handle = rot_cp
+        self._rotation_handle_obj = obj
+
+    def _handle_box(self, obj):
+        # Rotation handle of a rectangle or ellipse: 30 px out from the middle of its top edge
+        cx, cy = self.get_object_center(obj)
+        rot_pts = self._rotated_corners(obj)
+        top_mid = (
+            (rot_pts[0][0] + rot_pts[1][0]) / 2,
+            (rot_pts[0][1] + rot_pts[1][1]) / 2
+        )
+        dx = top_mid[0] - cx
+        dy = top_mid[1] - cy
+        norm = math.hypot(dx, dy)
+        if norm == 0:
+            norm = 1
+        dx /= norm
+        dy /= norm
+        rot_x = top_mid[0] + (-dy) * 30
+        rot_y = top_mid[1] + (dx) * 30
+        return rot_x, rot_y
+
+    def _handle_line(self, obj):
+        # Rotation handle of a line: 30 px out from its middle, perpendicular to it
+        (x0, y0), (x1, y1) = obj.coords
+        top_mid = ((x0 + x1) / 2, (y0 + y1) / 2)
+        dx = x1 - x0
+        dy = y1 - y0
+        norm = math.hypot(dx, dy)
+        if norm == 0:
+            norm = 1
+        dx /= norm
+        dy /= norm
+        perp_x = -dy
+        perp_y = dx
+        rot_x = top_mid[0] + perp_x * 30
+        rot_y = top_mid[1] + perp_y * 30
+        return rot_x, rot_y
+
+    def _handle_triangle(self, obj):
+        # Rotation handle of a triangle: 30 px out from the middle of its first edge
+        cx, cy = self.get_object_center(obj)
+        pts = obj.coords
+        top_mid = ((pts[0][0] + pts[1][0]) / 2, (pts[0][1] + pts[1][1]) / 2)
+        dx = top_mid[0] - cx
+        dy = top_mid[1] - cy
+        norm = math.hypot(dx, dy)
+        if norm == 0:
+            norm = 1
+        dx /= norm
+        dy /= norm
+        rot_x = top_mid[0] + (-dy) * 30
+        rot_y = top_mid[1] + (dx) * 30
+        return rot_x, rot_y
 
     def start_rotate_control_point(self, event, obj):
         # Start rotating the selected object
@@ -921,6 +1214,15 @@ class PaintEcran:
         a1 = math.atan2(event.y - oy, event.x - ox)
         delta_deg = math.degrees(a1 - a0)
         obj.angle = (self._rotate_start_angle + delta_deg) % 360
+        # Motion events can arrive faster than the canvas redraws: draw once per idle
+        # cycle, with the latest angle
+        if not self._rotation_redraw_pending:
+            self._rotation_redraw_pending = True
+            self.canvas.after_idle(self.apply_rotation_redraw, obj)
+
+    def apply_rotation_redraw(self, obj):
+        # Redraw a rotated object and its handle, once for all motion events since the last redraw
+        self._rotation_redraw_pending = False
         self.redraw_object_with_rotation(obj)
         self.show_control_points(obj)
 
@@ -941,104 +1243,131 @@ class PaintEcran:
 
     def get_object_center(self, obj):
         # Get the center point of an object
-        if obj.type in ("rectangle", "circle"):
-            (x0, y0), (x1, y1) = obj.coords
-            return ((x0 + x1) / 2, (y0 + y1) / 2)
-        elif obj.type == "line":
+        center = self._center_dispatch.get(obj.type)
+        if center is None:
+            return (0, 0)
+        return center(obj)
+
+    def _center_of_box(self, obj):
+        (x0, y0), (x1, y1) = obj.coords
+        return ((x0 + x1) / 2, (y0 + y1) / 2)
+
+    def _center_of_triangle(self, obj):
+        cx, cy = obj.coords.mean(axis=0)
+        return (cx, cy)
+
+    def _center_of_text(self, obj):
+        return obj.coords[0]
+
+    def _rotated_corners(self, obj):
+        # Canvas corners of a rectangle/ellipse bounding box, rotated about its center.
+        # Kept on the object until its coords or angle change (shared by handle and redraw)
+        if obj._corners is None:
             (x0, y0), (x1, y1) = obj.coords
-            return ((x0 + x1) / 2, (y0 + y1) / 2)
-        elif obj.type == "triangle":
-            pts = obj.coords
-            cx = sum(p[0] for p in pts) / 3
-            cy = sum(p[1] for p in pts) / 3
-            return (cx, cy)
-        elif obj.type == "text":
-            return obj.coords[0]
-        return (0, 0)
+            pts = np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], dtype=np.float64)
+            obj._corners = rotate_points(pts, *obj.rotation(), (x0 + x1) / 2, (y0 + y1) / 2)
+        return obj._corners
 
     def redraw_object_with_rotation(self, obj):
         # Redraw an object with its current rotation
-        self.canvas.delete(obj.canvas_id)
-        import math
-        if obj.type == "rectangle":
-            (x0, y0), (x1, y1) = obj.coords
-            cx, cy = self.get_object_center(obj)
-            pts = [
-                (x0, y0), (x1, y0), (x1, y1), (x0, y1)
-            ]
-            angle_rad = math.radians(obj.angle)
-            rot_pts = [
-                (
-                    cx + math.cos(angle_rad) * (px - cx) - math.sin(angle_rad) * (py - cy),
-                    cy + math.sin(angle_rad) * (px - cx) + math.cos(angle_rad) * (py - cy)
-                ) for (px, py) in pts
-            ]
-            obj.canvas_id = self.canvas.create_polygon(*sum(rot_pts, ()), outline="blue", fill="")
-        elif obj.type == "circle":
-            (x0, y0), (x1, y1) = obj.coords
-            cx, cy = self.get_object_center(obj)
-            rx = abs(x1 - x0) / 2
-            ry = abs(y1 - y0) / 2
-            angle = getattr(obj, 'angle', 0)
-            if abs(rx - ry) < 1e-2:
-                # Perfect circle: no visible rotation
-                obj.canvas_id = self.canvas.create_oval(x0, y0, x1, y1, outline="blue")
-            else:
-                # Ellipse: draw as polygon with rotation
-                points = []
-                steps = 60
-                for i in range(steps):
-                    t = 2 * math.pi * i / steps
-                    ex = cx + rx * math.cos(t)
-                    ey = cy + ry * math.sin(t)
-                    # Appliquer la rotation
-                    angle_rad = math.radians(angle)
-                    rot_x = cx + math.cos(angle_rad) * (ex - cx) - math.sin(angle_rad) * (ey - cy)
-                    rot_y = cy + math.sin(angle_rad) * (ex - cx) + math.cos(angle_rad) * (ey - cy)
-                    points.extend([rot_x, rot_y])
-                obj.canvas_id = self.canvas.create_polygon(points, outline="blue", fill="")
-        elif obj.type == "line":
-            (x0, y0), (x1, y1) = obj.coords
-            cx, cy = self.get_object_center(obj)
-            angle = getattr(obj, 'angle', 0)
-            angle_rad = math.radians(angle)
-            def rotate_point(px, py):
-                return (
-                    cx + math.cos(angle_rad) * (px - cx) - math.sin(angle_rad) * (py - cy),
-                    cy + math.sin(angle_rad) * (px - cx) + math.cos(angle_rad) * (py - cy)
-                )
-            rx0, ry0 = rotate_point(x0, y0)
-            rx1, ry1 = rotate_point(x1, y1)
-            x0_real, y0_real = self.canvas_to_real(rx0, ry0)
-            x1_real, y1_real = self.canvas_to_real(rx1, ry1)
-            obj.canvas_id = self.canvas.create_line(x0_real, y0_real, x1_real, y1_real, fill="blue", width=3 if hasattr(obj, 'selected') and obj.selected else 1)
-        elif obj.type == "triangle":
-            pts = obj.coords
+        redraw = self._redraw_dispatch.get(obj.type)
+        if redraw is not None:
+            redraw(obj)
+
+    def _redraw_rect(self, obj):
+        # Rectangle: plain rectangle item unrotated, polygon of its rotated corners otherwise
+        (x0, y0), (x1, y1) = obj.coords
+        if not obj.angle:
+            self._place_item(obj, "rectangle", (x0, y0, x1, y1), outline="blue")
+            return
+        rot_pts = self._rotated_corners(obj)
+        self._place_item(obj, "polygon", rot_pts.ravel().tolist(), outline="blue", fill="")
+
+    def _redraw_circle(self, obj):
+        # Circle/ellipse: oval item unless a rotated ellipse, which is drawn as a polygon
+        (x0, y0), (x1, y1) = obj.coords
+        cx, cy = self.get_object_center(obj)
+        rx = abs(x1 - x0) / 2
+        ry = abs(y1 - y0) / 2
+        angle = obj.angle
+        if abs(rx - ry) < 1e-2 or not angle:
+            # Perfect circle or unrotated ellipse: no visible rotation
+            self._place_item(obj, "oval", (x0, y0, x1, y1), outline="blue")
+        else:
+            # Ellipse: draw as polygon with rotation
+            # The rotation is the same for every point: use its cached sine and cosine
+            cos_a, sin_a = obj.rotation()
+            ex = rx * UNIT_CIRCLE_COS
+            ey = ry * UNIT_CIRCLE_SIN
+            # Appliquer la rotation, all points at once, interleaved as x0, y0, x1, y1...
+            points = np.empty((ELLIPSE_STEPS, 2))
+            points[:, 0] = cx + cos_a * ex - sin_a * ey
+            points[:, 1] = cy + sin_a * ex + cos_a * ey
+            self._place_item(obj, "polygon", points.ravel().tolist(), outline="blue", fill="")
+
+    def _redraw_line(self, obj):
+        # Line rotated about its middle
+        (x0, y0), (x1, y1) = obj.coords
+        if not obj.angle:
+            rx0, ry0, rx1, ry1 = x0, y0, x1, y1
+        else:
             cx, cy = self.get_object_center(obj)
-            angle_rad = math.radians(obj.angle)
-            def rotate_point(px, py):
-                return (
-                    cx + math.cos(angle_rad) * (px - cx) - math.sin(angle_rad) * (py - cy),
-                    cy + math.sin(angle_rad) * (px - cx) + math.cos(angle_rad) * (py - cy)
-                )
-            rot_pts = [rotate_point(px, py) for (px, py) in pts]
-            obj.canvas_id = self.canvas.create_polygon(*sum(rot_pts, ()), outline="blue", fill="")
-        elif obj.type == "text":
-            (x, y) = obj.coords[0]
-            size_mm = getattr(obj, 'size_mm', 5)
-            font = getattr(obj, 'font', 'DejaVu Sans')
-            obj.canvas_id = self.canvas.create_text(x, y, text=obj.text, font=(font, int(size_mm * 10)), anchor="nw")
+            cos_a, sin_a, tx, ty = obj.rotation_transform(cx, cy)
+            rx0, ry0 = cos_a * x0 - sin_a * y0 + tx, sin_a * x0 + cos_a * y0 + ty
+            rx1, ry1 = cos_a * x1 - sin_a * y1 + tx, sin_a * x1 + cos_a * y1 + ty
+        x0_real, y0_real = self.canvas_to_real(rx0, ry0)
+        x1_real, y1_real = self.canvas_to_real(rx1, ry1)
+        self._place_item(obj, "line", (x0_real, y0_real, x1_real, y1_real), fill="blue", width=3 if hasattr(obj, 'selected') and obj.selected else 1)
+
+    def _redraw_triangle(self, obj):
+        # Triangle rotated about its centroid
+        if not obj.angle:
+            self._place_item(obj, "polygon", obj.coords.ravel().tolist(), outline="blue", fill="")
+            return
+        cx, cy = self.get_object_center(obj)
+        rot_pts = rotate_points(obj.coords, *obj.rotation(), cx, cy)
+        self._place_item(obj, "polygon", rot_pts.ravel().tolist(), outline="blue", fill="")
+
+    def _redraw_text(self, obj):
+        # Text is not rotated: redraw it at its anchor
+        (x, y) = obj.coords[0]
+        size_mm = obj.size_mm
+        font = obj.font
+        self._place_item(obj, "text", (x, y), text=obj.text, font=(font, int(size_mm * 10)), anchor="nw")
+
+    def _place_item(self, obj, item_type, coords, **options):
+        # Move the object's canvas item in place when the last redraw left one of the same type:
+        # one coords call instead of delete + create. Options are only resent when they changed.
+        drawn = obj._drawn
+        if drawn is not None and drawn[0] == obj.canvas_id and drawn[1] == item_type:
+            self.canvas.coords(obj.canvas_id, *coords)
+            if drawn[2] != options:
+                self.canvas.itemconfigure(obj.canvas_id, **options)
+        else:
+            self.canvas.delete(obj.canvas_id)
+            create = getattr(self.canvas, "create_" + item_type)
+            obj.canvas_id = create(*coords, **options)
+        obj._drawn = (obj.canvas_id, item_type, options)
 
     def hide_control_points(self):
         # Remove all control points from the canvas
-        if hasattr(self, 'control_points'):
-            for cp in self.control_points:
-                self.canvas.delete(cp)
-            self.control_points = []
+        for cp in self.control_points:
+            self.canvas.delete(cp)
+        self.control_points = []
+        self._rotation_handle = None
+        self._rotation_handle_obj = None
 
     # --- Font size utility ---
     def mm_to_tk_font_size(self, size_mm):
         # Convert font size in mm to a suitable Tkinter font size (pixels)
+        key = (size_mm, self._current_scale)
+        size_px = self._font_size_cache.get(key)
+        if size_px is None:
+            size_px = self._font_size_cache[key] = self._measure_tk_font_size(size_mm)
+        return size_px
+
+    def _measure_tk_font_size(self, size_mm):
+        # Font size whose rendered "Hg" is size_mm tall at the current scale (one create/bbox/delete round-trip)
         test_id = self.canvas.create_text(0, 0, text="Hg", font=("DejaVu Sans", int(size_mm * self._current_scale)), anchor="nw")
         bbox = self.canvas.bbox(test_id)
         height_px = bbox[3] - bbox[1]
@@ -27,13 +27,44 @@ License:
     SOFTWARE.
 """
 
+import os
 import socket
 
 HOST = ''  # Listen on all interfaces
 PORT = 5001  # Choose a free port
 SAVE_PATH = '/home/c05pc13/Documents/gcodes/dxf3.dxf'  # Path to save the received file
+BUFFER_SIZE = 1 << 20  # 1 MiB per recv/write instead of one 4 KiB page
+
+
+def receive_file(conn, f):
+    """Copy everything the peer sends into the open file f, until it closes the connection."""
+    if hasattr(os, 'splice'):
+        # Linux: socket -> pipe -> file inside the kernel, the data never reaches Python
+        read_end, write_end = os.pipe()
+        try:
+            while True:
+                received = os.splice(conn.fileno(), write_end, BUFFER_SIZE)
+                if not received:
+                    break
+                while received:
+                    received -= os.splice(read_end, f.fileno(), received)
+        finally:
+            os.close(read_end)
+            os.close(write_end)
+    else:
+        # Elsewhere: receive into one reused buffer instead of a new bytes object per chunk
+        buffer = bytearray(BUFFER_SIZE)
+        view = memoryview(buffer)
+        while True:
+            received = conn.recv_into(buffer)
+            if not received:
+                break
+            f.write(view[:received])
+
 
 with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+    # Set before listen() so accepted connections inherit it and the TCP window is sized at the handshake
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE)
     s.bind((HOST, PORT))
     s.listen(1)
     print(f"Waiting for connection on port {PORT}...")
@@ -42,11 +73,7 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         with conn:
             print('Connected by', addr)
             # Open the file in binary write mode to save incoming data
-            with open(SAVE_PATH, 'wb') as f:
-                while True:
-                    data = conn.recv(4096)
-                    if not data:
-                        break
-                    f.write(data)
+            with open(SAVE_PATH, 'wb', buffering=0) as f:
+                receive_file(conn, f)
             print("File received and saved.")
 
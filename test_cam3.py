@@ -28,12 +28,13 @@ License:
 """
 
 # ======== IMPORTS ========
+import os
 import open3d as o3d
 import pyrealsense2 as rs
 import numpy as np
 import cv2
 from scipy.spatial.transform import Rotation as R
-from sklearn.cluster import DBSCAN
+from scipy import ndimage
 from scipy.spatial import cKDTree
 
 # ======== CONFIGURATION ========
@@ -44,24 +45,31 @@ min_depth = 150                              # Minimum depth for filtering
 color_to_filter = np.array([128, 96, 49])    # Target color to filter (RGB)
 positive_tolerance = np.array([20, 20, 20])  # Positive color tolerance
 negative_tolerance = np.array([30, 30, 30])  # Negative color tolerance
+color_lower = np.clip(color_to_filter - negative_tolerance, 0, 255).astype(np.uint8)  # 8-bit color window
+color_upper = np.clip(color_to_filter + positive_tolerance, 0, 255).astype(np.uint8)
 voxel_size = 0.001                           # Voxel size for downsampling
+icp_max_distance = 0.01                      # ICP correspondence distance (m), same as the sweep fit tolerance
+icp_max_iterations = 50                      # ICP iteration cap
+piece_static_tolerance = 0.002               # Centroid and extent change (m) under which the piece counts as static
+piece_cache_frames = 30                      # Most frames the downsampled piece is reused before a rebuild
+DEBUG_VIS = os.environ.get("DEBUG_VIS", "0") == "1"  # Blocking Open3D windows at each step (DEBUG_VIS=1)
 camera_position_world = np.array([0.42104, 0, 0.78244]) # Camera position in world coordinates
 camera_quaternion = [0.0, 0.707107, -0.707107, 0]       # Camera orientation as quaternion
 
 # ======== MODEL PREPROCESSING ========
-# Load STL file and sample points
+# Load STL file and keep only its bottom face: triangles whose three vertices lie on the lowest z
 mesh = o3d.io.read_triangle_mesh(piece_path)
 mesh.scale(0.001, center=mesh.get_center())
-pcd_model = mesh.sample_points_uniformly(number_of_points)
-pcd_model.estimate_normals()
-
-model_points = np.asarray(pcd_model.points)
-z_min = np.min(model_points[:, 2])
+mesh_vertices = np.asarray(mesh.vertices)
+z_min = np.min(mesh_vertices[:, 2])
 tolerance_z = 0.0001
-filtered_model_points = model_points[np.abs(model_points[:, 2] - z_min) <= tolerance_z]
+on_bottom = np.all(np.abs(mesh_vertices[np.asarray(mesh.triangles), 2] - z_min) <= tolerance_z, axis=1)
+total_area = mesh.get_surface_area()
+mesh.remove_triangles_by_mask((~on_bottom).tolist())
 
-pcd_model = o3d.geometry.PointCloud()
-pcd_model.points = o3d.utility.Vector3dVector(filtered_model_points)
+# Sample the bottom face only, at the density of number_of_points over the whole mesh
+bottom_points = max(1, round(number_of_points * mesh.get_surface_area() / total_area))
+pcd_model = mesh.sample_points_poisson_disk(bottom_points)
 pcd_model.estimate_normals()
 
 # Rotate model 180 degrees around Z axis
@@ -69,50 +77,59 @@ rotation_matrix = o3d.geometry.get_rotation_matrix_from_axis_angle([0, 0, np.pi]
 pcd_model.rotate(rotation_matrix, center=pcd_model.get_center())
 
 # Visual monitoring: show the preprocessed model
-print("[Visual] Showing preprocessed model point cloud")
-o3d.visualization.draw_geometries([pcd_model], window_name="Model Preprocessing")
+if DEBUG_VIS:
+    print("[Visual] Showing preprocessed model point cloud")
+    o3d.visualization.draw_geometries([pcd_model], window_name="Model Preprocessing")
 
 # ======== CAMERA INITIALIZATION ========
 pipeline = rs.pipeline()
 config = rs.config()
 config.enable_stream(rs.stream.depth, 1280, 720, rs.format.z16, 30)
-config.enable_stream(rs.stream.color, 1280, 720, rs.format.bgr8, 30)
+config.enable_stream(rs.stream.color, 1280, 720, rs.format.rgb8, 30)  # RGB straight from the camera
 pipeline.start(config)
 align = rs.align(rs.stream.color)
+decimation = rs.decimation_filter(2)  # 2:1 per axis: 640x360 aligned depth, a quarter of the points
+threshold = rs.threshold_filter(min_depth / 1000.0, max_depth / 1000.0)  # Depth range in the SDK (m)
 spatial = rs.spatial_filter()
 temporal = rs.temporal_filter()
-
+pc = rs.pointcloud()
+
+# Camera transformation in world coordinates and piece frame correction: fixed, computed once
+camera_orientation_world = R.from_quat([camera_quaternion[1], camera_quaternion[2], camera_quaternion[3], camera_quaternion[0]])
+camera_transformation_world = np.eye(4)
+camera_transformation_world[:3, :3] = camera_orientation_world.as_matrix()
+camera_transformation_world[:3, 3] = camera_position_world
+rotation_90_x = np.eye(4)
+rotation_90_x[:3, :3] = R.from_euler('x', 90, degrees=True).as_matrix()
+global_transformation = np.eye(4)  # Piece pose in camera coordinates, refilled every frame
+
+# The model never changes shape, only pose: downsample it once here rather than every frame
+pcd_model = pcd_model.voxel_down_sample(voxel_size)
 initial_model_points = np.asarray(pcd_model.points).copy()
 
 # ======== UTILITY FUNCTIONS ========
-def find_best_rotation(pcd_model, pcd_piece, axis, angle_range, angle_step=3, fit_tolerance=0.01):
+def find_best_rotation(pcd_model, pcd_piece, axis, angle_range, angle_step=3, fit_tolerance=0.01, tree=None):
     """
     Find the best rotation angle for aligning the model to the piece point cloud.
+    tree is an optional prebuilt cKDTree of the piece points.
     Returns the best rotation matrix and fit percentage.
     """
-    def calculate_average_distance(source_points, target_points):
-        tree = cKDTree(target_points)
-        distances, _ = tree.query(source_points, k=1)
-        return np.mean(distances), distances
-
     initial_model_points = np.asarray(pcd_model.points).copy()
     center_of_model = np.mean(initial_model_points, axis=0)
-    best_angle = None
-    min_distance = float('inf')
-    best_distances = None
     angles = np.arange(*angle_range, angle_step)
-
-    for angle in angles:
-        pcd_model.points = o3d.utility.Vector3dVector(initial_model_points)
-        angle_rad = np.radians(angle)
-        rotation_vector = [angle_rad if axis == 'x' else 0, angle_rad if axis == 'y' else 0, angle_rad if axis == 'z' else 0]
-        rotation_matrix = o3d.geometry.get_rotation_matrix_from_axis_angle(rotation_vector)
-        pcd_model.rotate(rotation_matrix, center=center_of_model)
-        avg_distance, distances = calculate_average_distance(np.asarray(pcd_model.points), np.asarray(pcd_piece.points))
-        if avg_distance < min_distance:
-            min_distance = avg_distance
-            best_angle = angle
-            best_distances = distances
+    if tree is None:
+        # The piece does not move during the sweep: build once, with the same fast-build options as the main loop
+        tree = cKDTree(np.asarray(pcd_piece.points), leafsize=32, balanced_tree=False, compact_nodes=False)
+
+    # Rotate the model by every candidate angle at once: (angles, points, 3), then one batched query
+    rotations = R.from_euler(axis, angles, degrees=True).as_matrix()
+    centered = initial_model_points - center_of_model
+    candidates = centered @ rotations.transpose(0, 2, 1) + center_of_model
+    distances, _ = tree.query(candidates.reshape(-1, 3), k=1, workers=-1)
+    distances = distances.reshape(len(angles), -1)
+    best_index = np.argmin(distances.mean(axis=1))
+    best_angle = angles[best_index]
+    best_distances = distances[best_index]
 
     pcd_model.points = o3d.utility.Vector3dVector(initial_model_points)
     angle_rad = np.radians(best_angle)
@@ -128,6 +145,13 @@ def find_best_rotation(pcd_model, pcd_piece, axis, angle_range, angle_step=3, fi
     return best_rotation_matrix, fit_percent
 
 # ======== MAIN LOOP ========
+# Downsampled piece and its KD-tree, reused while the detected piece stays put
+cached_centroid = None
+cached_extent = None
+cached_frames = 0
+pcd_piece_down = None
+piece_tree = None
+
 try:
     while True:
         # Reset model points and color
@@ -136,113 +160,124 @@ try:
 
         # Capture frames from camera
         frames = pipeline.wait_for_frames()
+        # Processing a frame takes longer than the 33 ms frame period: skip to the newest queued frame
+        while True:
+            newer_frames = pipeline.poll_for_frames()
+            if not newer_frames:
+                break
+            frames = newer_frames
         aligned_frames = align.process(frames)
         depth_frame = aligned_frames.get_depth_frame()
         color_frame = aligned_frames.get_color_frame()
         if not depth_frame or not color_frame:
             continue
 
-        # Apply spatial and temporal filters
+        # Apply decimation, depth range, spatial and temporal filters
+        depth_frame = decimation.process(depth_frame)
+        depth_frame = threshold.process(depth_frame)
         depth_frame = spatial.process(depth_frame)
         depth_frame = temporal.process(depth_frame)
 
-        # Convert images to numpy arrays
+        # Deproject the depth frame with the SDK (depth is aligned to color, then decimated: vertex
+        # (row, col) lies on color pixel (color_step * row, color_step * col)). Sizes are read from
+        # the frames, so a change of resolution or decimation magnitude cannot mis-map the vertices
+        depth_width = depth_frame.as_video_frame().get_width()
+        color_step = color_frame.get_width() // depth_width
+        points_rs = pc.calculate(depth_frame)
+        vertices = np.asanyarray(points_rs.get_vertices()).view(np.float32).reshape(-1, 3)
         color_image = np.asanyarray(color_frame.get_data())
-        depth_image = np.asanyarray(depth_frame.get_data())
-        depth_image = np.where((depth_image > min_depth) & (depth_image < max_depth), depth_image, 0)
-        color_image = cv2.cvtColor(color_image, cv2.COLOR_BGR2RGB)
-
-        # Get camera intrinsics
-        intr = depth_frame.profile.as_video_stream_profile().intrinsics
-        intrinsic_o3d = o3d.camera.PinholeCameraIntrinsic(
-            intr.width, intr.height, intr.fx, intr.fy, intr.ppx, intr.ppy
-        )
 
-        # Create Open3D point cloud from RGBD image
-        depth_o3d = o3d.geometry.Image(depth_image)
-        color_o3d = o3d.geometry.Image(color_image)
-        rgbd_image = o3d.geometry.RGBDImage.create_from_color_and_depth(
-            color_o3d, depth_o3d, depth_scale=1000.0, depth_trunc=3.0, convert_rgb_to_intensity=False
-        )
-        pcd = o3d.geometry.PointCloud.create_from_rgbd_image(rgbd_image, intrinsic_o3d)
-
-        # Filter by color
-        target_color = color_to_filter / 255.0
-        tolerance_positive = positive_tolerance / 255.0
-        tolerance_negative = negative_tolerance / 255.0
-        colors = np.asarray(pcd.colors)
-        mask = np.all(
-            (colors >= (target_color - tolerance_negative)) &
-            (colors <= (target_color + tolerance_positive)),
-            axis=1
-        )
-        pcd_filtered = pcd.select_by_index(np.where(mask)[0])
+        # Keep points with depth: the threshold filter already zeroed those outside the depth range
+        kept = np.flatnonzero(vertices[:, 2])
+
+        # Filter by color, comparing the 8-bit values of those points' pixels: only the target points are gathered
+        kept_colors = color_image[color_step * (kept // depth_width), color_step * (kept % depth_width)]
+        kept = kept[np.all((kept_colors >= color_lower) & (kept_colors <= color_upper), axis=1)]
+        points = vertices[kept]  # Single float32 gather of the target points
 
-        # Cluster and select largest cluster
-        points = np.asarray(pcd_filtered.points)
+        # Cluster on a voxel grid (touching occupied voxels, 26-connected) and select largest cluster.
+        # Two 26-connected voxels span two voxel diagonals: a voxel of eps / (2 * sqrt(3)) links points at most eps apart
         eps = 0.01
-        min_points = 10
-        clustering = DBSCAN(eps=eps, min_samples=min_points).fit(points)
-        labels = clustering.labels_
-        unique_labels, counts = np.unique(labels, return_counts=True)
-        target_label = unique_labels[np.argmax(counts)]
+        min_points = 10  # As DBSCAN's min_samples: voxels with fewer points within about eps are noise
+        cluster_voxel = eps / (2 * np.sqrt(3))
+        voxel_index = np.floor(points / cluster_voxel).astype(np.int32)
+        voxel_index -= voxel_index.min(axis=0)
+        voxel_index = tuple(voxel_index.T)
+        grid_shape = np.max(voxel_index, axis=1) + 1
+        counts = np.bincount(np.ravel_multi_index(voxel_index, grid_shape), minlength=np.prod(grid_shape))
+        counts = counts.reshape(grid_shape).astype(np.float32)
+        # Points in the window of voxels within eps, the grid counterpart of DBSCAN's core-point test:
+        # stray points can neither form a cluster nor bridge two
+        window = 2 * int(eps / cluster_voxel) + 1
+        neighbours = ndimage.uniform_filter(counts, size=window, mode="constant") * window ** 3
+        grid = (counts > 0) & (neighbours > min_points - 0.5)
+        voxel_labels, _ = ndimage.label(grid, structure=np.ones((3, 3, 3)))
+        labels = voxel_labels[voxel_index]
+        cluster_sizes = np.bincount(labels)
+        cluster_sizes[0] = 0  # Label 0: points of noise voxels
+        if not cluster_sizes.any():
+            continue
+        target_label = np.argmax(cluster_sizes)
         mask = labels == target_label
-        piece_points = points[mask]
+        piece_points = points[mask].astype(np.float64)  # Only the piece is widened for Open3D
         pcd_piece = o3d.geometry.PointCloud()
         pcd_piece.points = o3d.utility.Vector3dVector(piece_points)
 
         # Visual monitoring: show filtered and clustered piece (in red)
-        pcd_piece.paint_uniform_color([1, 0, 0])
-        print("[Visual] Showing filtered and clustered piece point cloud (red)")
-        o3d.visualization.draw_geometries([pcd_piece], window_name="Filtered/Clustered Piece")
+        if DEBUG_VIS:
+            pcd_piece.paint_uniform_color([1, 0, 0])
+            print("[Visual] Showing filtered and clustered piece point cloud (red)")
+            o3d.visualization.draw_geometries([pcd_piece], window_name="Filtered/Clustered Piece")
 
         # Align model to detected piece
         average_position_piece = np.mean(piece_points, axis=0)
         model_points = np.asarray(pcd_model.points)
         average_position_model = np.mean(model_points, axis=0)
         translation = average_position_piece - average_position_model
-        initial_transformation = np.eye(4)
-        initial_transformation[:3, 3] = translation
-        pcd_model.transform(initial_transformation)
-
-        # Downsample both clouds
-        pcd_model = pcd_model.voxel_down_sample(voxel_size)
-        pcd_piece = pcd_piece.voxel_down_sample(voxel_size)
-
-        # Find best rotation for each axis
-        rot_Y, fit_Y = find_best_rotation(pcd_model, pcd_piece, axis='y', angle_range=(-30, 35))
-        rot_X, fit_X = find_best_rotation(pcd_model, pcd_piece, axis='x', angle_range=(-30, 35))
-        rot_Z, fit_Z = find_best_rotation(pcd_model, pcd_piece, axis='z', angle_range=(0, 360))
-        best_rotation_matrix = rot_X @ rot_Y @ rot_Z
-        print(f"Fit Y: {fit_Y:.1f}%, Fit X: {fit_X:.1f}%, Fit Z: {fit_Z:.1f}%")
+        pcd_model.translate(translation)
+
+        # Downsample the piece cloud. Centroid and bounding-box extent within piece_static_tolerance of the
+        # cached piece: static piece, keep the previous downsampled cloud and KD-tree for up to
+        # piece_cache_frames frames, so a piece turning in place is picked up again
+        piece_extent = np.ptp(piece_points, axis=0)
+        cached_frames += 1
+        if (cached_centroid is None or cached_frames > piece_cache_frames
+                or np.abs(average_position_piece - cached_centroid).max() > piece_static_tolerance
+                or np.abs(piece_extent - cached_extent).max() > piece_static_tolerance):
+            pcd_piece_down = pcd_piece.voxel_down_sample(voxel_size)
+            # Sliding-midpoint splits build faster than median splits and are as good for batched queries
+            piece_tree = cKDTree(np.asarray(pcd_piece_down.points), leafsize=32, balanced_tree=False, compact_nodes=False)
+            cached_centroid, cached_extent, cached_frames = average_position_piece, piece_extent, 0
+        pcd_piece = pcd_piece_down
+
+        # Coarse yaw: the only search that needs to be global (part may lie at any angle on the table)
+        rot_Z, fit_Z = find_best_rotation(pcd_model, pcd_piece, axis='z', angle_range=(0, 360), tree=piece_tree)
+
+        # Refine tilt, yaw and position in one ICP run from the coarse pose. Point-to-point: the model is a
+        # single flat layer, whose normals would not constrain in-plane motion with point-to-plane
+        icp_result = o3d.pipelines.registration.registration_icp(
+            pcd_model, pcd_piece, icp_max_distance, np.eye(4),
+            o3d.pipelines.registration.TransformationEstimationPointToPoint(),
+            o3d.pipelines.registration.ICPConvergenceCriteria(max_iteration=icp_max_iterations)
+        )
+        pcd_model.transform(icp_result.transformation)
+        best_rotation_matrix = icp_result.transformation[:3, :3] @ rot_Z
+        piece_position = icp_result.transformation[:3, :3] @ average_position_piece + icp_result.transformation[:3, 3]
+        print(f"Fit Z: {fit_Z:.1f}%, ICP fit: {icp_result.fitness * 100:.1f}% (rmse={icp_result.inlier_rmse:.4f})")
 
         # Visual monitoring: show alignment result (model in green, piece in red)
-        pcd_model.paint_uniform_color([0, 1, 0])
-        pcd_piece.paint_uniform_color([1, 0, 0])
-        print("[Visual] Showing alignment result: model (green), piece (red)")
-        o3d.visualization.draw_geometries([pcd_model, pcd_piece], window_name="Alignment Result")
-
-        # Compute global transformation
-        global_transformation = np.eye(4)
-        translation_matrix = np.eye(4)
-        translation_matrix[:3, 3] = average_position_piece
-        global_transformation = global_transformation @ translation_matrix
-        rotation_matrix_4x4 = np.eye(4)
-        rotation_matrix_4x4[:3, :3] = best_rotation_matrix
-        global_transformation = global_transformation @ rotation_matrix_4x4
-
-        # Camera transformation in world coordinates
-        camera_orientation_world = R.from_quat([camera_quaternion[1], camera_quaternion[2], camera_quaternion[3], camera_quaternion[0]])
-        camera_orientation_matrix = camera_orientation_world.as_matrix()
-        camera_transformation_world = np.eye(4)
-        camera_transformation_world[:3, :3] = camera_orientation_matrix
-        camera_transformation_world[:3, 3] = camera_position_world
+        if DEBUG_VIS:
+            pcd_model.paint_uniform_color([0, 1, 0])
+            pcd_piece.paint_uniform_color([1, 0, 0])
+            print("[Visual] Showing alignment result: model (green), piece (red)")
+            o3d.visualization.draw_geometries([pcd_model, pcd_piece], window_name="Alignment Result")
+
+        # Compute global transformation (translation then rotation: [R | t] filled in place)
+        global_transformation[:3, :3] = best_rotation_matrix
+        global_transformation[:3, 3] = piece_position
 
         # Piece transformation in world coordinates
-        piece_transformation_world = camera_transformation_world @ global_transformation
-        rotation_90_x = np.eye(4)
-        rotation_90_x[:3, :3] = R.from_euler('x', 90, degrees=True).as_matrix()
-        piece_transformation_world = piece_transformation_world @ rotation_90_x
+        piece_transformation_world = camera_transformation_world @ global_transformation @ rotation_90_x
 
         piece_position_world = piece_transformation_world[:3, 3]
         piece_orientation_world = piece_transformation_world[:3, :3]